@@ -0,0 +1,84 @@
+"""
+ContentDetector against the vectorized BatchDetector (HSV and luma), on
+generated videos with known cuts: detector time on frames that are
+already decoded, total analysis time, and how the cuts compare with the
+ground truth.
+
+Run from the project folder:
+    python -m benchmarks.bench_detectors --frames 1200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+from scenedetect.detectors import ContentDetector
+
+from batch_detector import BatchDetector
+from benchmarks.bench_scene_detection import cut_accuracy
+from benchmarks.common import make_synthetic_video, remove_quietly
+from scene_analysis import default_downscale, detect_frame, detect_scenes_fast, detection_frame, finish_detection
+
+
+def detection_frames(video_file):
+    """Decodes the whole file into the downscaled frames the detectors look at."""
+    cap = cv2.VideoCapture(video_file)
+    downscale = default_downscale(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(detection_frame(frame, downscale).copy())
+    cap.release()
+    return frames
+
+
+def detector_only(detector, frames, fps=30.0):
+    """Seconds spent in the detector alone, and the cuts it found."""
+    start = time.perf_counter()
+    cuts = []
+    for frame_num, frame in enumerate(frames):
+        cuts.extend(detect_frame(detector, frame_num, frame, fps))
+    cuts.extend(finish_detection(detector, len(frames), fps))
+    return time.perf_counter() - start, sorted(set(cuts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the batch scene detector against ContentDetector.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=900)
+    parser.add_argument("--scene-lengths", default="23,47,120", help="One test video per scene length.")
+    args = parser.parse_args()
+
+    detectors = [
+        ("ContentDetector", ContentDetector),
+        ("Batch hsv", lambda: BatchDetector(method="hsv")),
+        ("Batch luma", lambda: BatchDetector(method="luma")),
+    ]
+
+    work_dir = tempfile.mkdtemp(prefix="bench_detectors_")
+    source = os.path.join(work_dir, "source.mp4")
+    print(f"{args.frames} frames at {args.width}x{args.height} per video")
+    print(f"{'scene len':>9}  {'detector':<16}{'detect s':>9}{'total s':>9}{'exact':>7}{'missed':>8}{'extra':>7}{'err':>6}")
+    for scene_length in (int(length) for length in args.scene_lengths.split(",")):
+        truth = make_synthetic_video(source, args.width, args.height, args.frames, scene_length=scene_length)
+        frames = detection_frames(source)
+        for name, make in detectors:
+            detect_seconds, _ = detector_only(make(), frames)
+            start = time.perf_counter()
+            scene_list = detect_scenes_fast(source, detector=make())
+            total_seconds = time.perf_counter() - start
+            cuts = [scene_start.get_frames() for scene_start, _ in scene_list[1:]]
+            exact, missed, extra, error = cut_accuracy(truth, cuts)
+            print(f"{scene_length:>9}  {name:<16}{detect_seconds:>9.3f}{total_seconds:>9.2f}"
+                  f"{exact:>7}{missed:>8}{extra:>7}{error:>6.2f}")
+        remove_quietly(source)
+
+    os.rmdir(work_dir)
+
+
+if __name__ == "__main__":
+    main()
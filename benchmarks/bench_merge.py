@@ -0,0 +1,66 @@
+"""
+Merge of clips that already match the output against a mixed merge whose
+clips have to be resampled and scaled (another frame rate, another size,
+another shape). Also checks the merged frame counts.
+
+Run from the project folder:
+    python -m benchmarks.bench_merge --frames 600
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_smart_render import count_frames
+from benchmarks.common import make_synthetic_video, remove_quietly
+from video_ops import VideoOptions, merge_clips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark merging mixed clips against matching ones.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=600, help="Frames per 30 fps clip.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_merge_")
+    width, height, frames = args.width, args.height, args.frames
+    base = os.path.join(work_dir, "base.mp4")
+    make_synthetic_video(base, width, height, frames, fps=30.0)
+    fast = os.path.join(work_dir, "fast.mp4") # Same length in time at 60 fps
+    make_synthetic_video(fast, width, height, frames * 2, fps=60.0)
+    large = os.path.join(work_dir, "large.mp4")
+    make_synthetic_video(large, width * 3 // 2, height * 3 // 2, frames, fps=30.0)
+    square = os.path.join(work_dir, "square.mp4")
+    make_synthetic_video(square, height, height, frames, fps=30.0)
+
+    runs = [
+        ("matching", [base, base, base, base]),
+        ("mixed", [base, fast, large, square]),
+    ]
+
+    options = VideoOptions()
+    options.merge_mode = "reencode" # Compare decode/encode speed, not stream copies
+    options.encode_workers = args.workers
+    expected = frames * 4
+
+    print(f"4 clips of {frames} frames at 30 fps (or the same duration at 60 fps), output {width}x{height}")
+    print(f"{'merge':<10}{'seconds':>10}{'fps':>10}{'relative':>10}{'frames ok':>11}")
+    base_seconds = None
+    for name, clips in runs:
+        start = time.perf_counter()
+        output = merge_clips(clips, work_dir, options)
+        seconds = time.perf_counter() - start
+        base_seconds = base_seconds or seconds
+        frames_ok = count_frames(output) == expected
+        print(f"{name:<10}{seconds:>10.2f}{expected / seconds:>10.1f}{base_seconds / seconds:>10.2f}{str(frames_ok):>11}")
+        remove_quietly(output)
+
+    for path in (base, fast, large, square):
+        remove_quietly(path)
+    os.rmdir(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Single-threaded read/write loop against the decode -> transform -> encode
+frame pipeline, for a straight copy and a copy that scales every frame,
+at two clip lengths so you can see that peak memory doesn't grow with the
+length of the output.
+
+Run from the project folder:
+    python -m benchmarks.bench_pipeline --frames 600
+"""
+import argparse
+import os
+import tempfile
+
+import cv2
+
+from benchmarks.common import format_bytes, make_synthetic_video, measure_in_subprocess, remove_quietly
+from frame_pipeline import DEFAULT_DEPTH, decode_frames, write_frames
+
+
+def _open(input_path, output_path, scale):
+    cap = cv2.VideoCapture(input_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    size = (width // scale, height // scale)
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), cap.get(cv2.CAP_PROP_FPS), size)
+    return cap, out, (height, width, 3), size
+
+
+def serial_copy(input_path, output_path, scale):
+    """The old way: read, (scale,) write, one frame after another on one thread."""
+    cap, out, _, size = _open(input_path, output_path, scale)
+    count = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        out.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA) if scale > 1 else frame)
+        count += 1
+    cap.release()
+    out.release()
+    return count
+
+
+def pipelined_copy(input_path, output_path, scale, depth):
+    cap, out, frame_shape, size = _open(input_path, output_path, scale)
+
+    def resize(frame, dst):
+        cv2.resize(frame, size, dst=dst, interpolation=cv2.INTER_AREA)
+
+    transform = resize if scale > 1 else None
+    count = write_frames(out, decode_frames(cap), frame_shape, transform=transform,
+                         output_shape=(size[1], size[0], 3), depth=depth)
+    cap.release()
+    out.release()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the frame pipeline against a serial loop.")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=600, help="Length of the short clip; the long one is 4x.")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="Buffers per pipeline stage.")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    output = os.path.join(work_dir, "output.mp4")
+    sources = []
+    for frames in (args.frames, args.frames * 4):
+        source = os.path.join(work_dir, f"source_{frames}.mp4")
+        make_synthetic_video(source, args.width, args.height, frames)
+        sources.append((frames, source))
+
+    print(f"{args.width}x{args.height}, pipeline depth {args.depth}")
+    print(f"{'frames':>7}  {'run':<22}{'fps':>10}{'seconds':>10}{'speedup':>9}{'peak RSS':>14}")
+    for frames, source in sources:
+        for scale, label in ((1, "copy"), (2, "copy + scale 1/2")):
+            base_fps = None
+            for name, func, func_args in (("serial", serial_copy, (source, output, scale)),
+                                          ("pipeline", pipelined_copy, (source, output, scale, args.depth))):
+                result = measure_in_subprocess(func, *func_args)
+                base_fps = base_fps or result["fps"]
+                print(f"{frames:>7}  {name + ' ' + label:<22}{result['fps']:>10.1f}{result['seconds']:>10.2f}"
+                      f"{result['fps'] / base_fps:>9.2f}{format_bytes(result['peak_rss']):>14}")
+                remove_quietly(output)
+        remove_quietly(source)
+
+    os.rmdir(work_dir)
+
+
+if __name__ == "__main__":
+    main()
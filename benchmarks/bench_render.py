@@ -0,0 +1,95 @@
+"""
+Per-frame render cost for the video + preview labels: the old "resize,
+convert and new PhotoImage per label" approach against FrameRenderer.
+Reports wall time, CPU time and traced allocations per frame. Needs a
+display, since it draws into real Tk labels.
+
+Run from the project folder:
+    python -m benchmarks.bench_render --frames 300
+"""
+import argparse
+import time
+import tkinter as tk
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+from render_pipeline import FrameRenderer
+
+
+def legacy_display(frame, label):
+    """The original _display_frame: everything redone for every label."""
+    label_width = label.winfo_width()
+    label_height = label.winfo_height()
+    h, w, _ = frame.shape
+    aspect_ratio = w / h
+    new_w = label_width
+    new_h = int(new_w / aspect_ratio)
+    if new_h > label_height:
+        new_h = label_height
+        new_w = int(new_h * aspect_ratio)
+
+    resized_frame = cv2.resize(frame, (new_w, new_h))
+    rgb_frame = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB)
+    photo_image = ImageTk.PhotoImage(Image.fromarray(rgb_frame))
+    label.config(image=photo_image)
+    label.image = photo_image
+
+
+def run(render, frames, root):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    allocated = 0
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for frame in frames:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        render(frame)
+        root.update_idletasks()
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    tracemalloc.stop()
+    count = len(frames)
+    return wall / count * 1000, cpu / count * 1000, allocated / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-frame rendering.")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    root.geometry("600x500")
+    video_label = tk.Label(root, bg="black")
+    video_label.place(x=0, y=0, width=580, height=330)
+    preview_label = tk.Label(root, bg="black")
+    preview_label.place(x=0, y=340, width=150, height=120)
+    root.update()
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, size=(args.height, args.width, 3), dtype=np.uint8) for _ in range(8)]
+    frames = (frames * (args.frames // len(frames) + 1))[:args.frames]
+
+    renderer = FrameRenderer()
+    runs = [
+        ("legacy", lambda frame: (legacy_display(frame, video_label), legacy_display(frame, preview_label))),
+        ("FrameRenderer", lambda frame: renderer.render(frame, (video_label, preview_label))),
+    ]
+
+    print(f"{args.frames} frames of {args.width}x{args.height} onto two labels")
+    print(f"{'renderer':<16}{'wall ms':>10}{'cpu ms':>10}{'alloc KB':>12}")
+    for name, render in runs:
+        render(frames[0]) # warm up
+        wall_ms, cpu_ms, alloc = run(render, frames, root)
+        print(f"{name:<16}{wall_ms:>10.2f}{cpu_ms:>10.2f}{alloc / 1024:>12.1f}")
+
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compares the old load-everything reverse against the bounded-memory engine.
+
+Run from the project folder:
+    python -m benchmarks.bench_reverse --frames 900 --width 1280 --height 720
+"""
+import argparse
+import os
+import tempfile
+
+import cv2
+
+from benchmarks.common import format_bytes, make_synthetic_video, measure_in_subprocess, remove_quietly
+from reverse_engine import reverse_video
+
+
+def legacy_reverse(input_path, output_path):
+    """The original approach: keep every decoded frame in a list."""
+    cap = cv2.VideoCapture(input_path)
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    frames.reverse()
+
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (frame_width, frame_height))
+    for frame in frames:
+        out.write(frame)
+    out.release()
+    return len(frames)
+
+
+def engine_reverse(input_path, output_path, memory_limit, strategy):
+    return reverse_video(input_path, output_path, memory_limit=memory_limit, strategy=strategy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the reverse engine.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--memory-limit-mb", type=int, default=64)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_reverse_")
+    source = os.path.join(work_dir, "source.mp4")
+    output = os.path.join(work_dir, "reversed.mp4")
+    make_synthetic_video(source, args.width, args.height, args.frames)
+    memory_limit = args.memory_limit_mb * 1024 * 1024
+
+    runs = [
+        ("legacy (list)", legacy_reverse, (source, output)),
+        ("engine seek", engine_reverse, (source, output, memory_limit, "seek")),
+        ("engine spill", engine_reverse, (source, output, memory_limit, "spill")),
+    ]
+
+    print(f"{args.frames} frames at {args.width}x{args.height}, chunk limit {args.memory_limit_mb} MB")
+    print(f"{'approach':<16}{'fps':>10}{'seconds':>10}{'peak RSS':>14}")
+    for name, func, func_args in runs:
+        result = measure_in_subprocess(func, *func_args)
+        print(f"{name:<16}{result['fps']:>10.1f}{result['seconds']:>10.2f}{format_bytes(result['peak_rss']):>14}")
+        remove_quietly(output)
+
+    remove_quietly(source)
+    os.rmdir(work_dir)
+
+
+if __name__ == "__main__":
+    main()
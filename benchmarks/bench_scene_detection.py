@@ -0,0 +1,90 @@
+"""
+Compares the SceneManager path used by AI Auto Clip against the fast
+analysis mode (detection downscale + frame stride + cut refinement), both
+for speed and for where the cuts land.
+
+Run from the project folder:
+    python -m benchmarks.bench_scene_detection --width 3840 --height 2160
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from scenedetect import SceneManager, open_video
+from scenedetect.detectors import ContentDetector
+
+from benchmarks.common import make_synthetic_video, remove_quietly
+from scene_analysis import detect_scenes_fast
+
+
+def scene_manager_cuts(video_file):
+    video = open_video(video_file)
+    scene_manager = SceneManager()
+    scene_manager.add_detector(ContentDetector())
+    scene_manager.detect_scenes(video=video)
+    return [start.get_frames() for start, _ in scene_manager.get_scene_list()[1:]]
+
+
+def fast_cuts(video_file, downscale, stride):
+    scene_list = detect_scenes_fast(video_file, downscale=downscale, stride=stride)
+    return [start.get_frames() for start, _ in scene_list[1:]]
+
+
+def cut_accuracy(reference, cuts):
+    """Returns (exact matches, missed, extra, mean frame error of the matches within 5 frames)."""
+    exact = missed = 0
+    errors = []
+    remaining = list(cuts)
+    for ref in reference:
+        nearest = min(remaining, key=lambda c: abs(c - ref), default=None)
+        if nearest is None or abs(nearest - ref) > 5:
+            missed += 1
+            continue
+        remaining.remove(nearest)
+        errors.append(abs(nearest - ref))
+        exact += nearest == ref
+    mean_error = sum(errors) / len(errors) if errors else 0.0
+    return exact, missed, len(remaining), mean_error
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fast scene analysis.")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--scene-length", type=int, default=47)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_scenes_")
+    source = os.path.join(work_dir, "source.mp4")
+    truth = make_synthetic_video(source, args.width, args.height, args.frames, scene_length=args.scene_length)
+
+    reference, base_seconds = timed(scene_manager_cuts, source)
+    print(f"{args.frames} frames at {args.width}x{args.height}, {len(truth)} true cuts")
+    print(f"{'mode':<24}{'seconds':>9}{'speedup':>9}{'exact':>7}{'missed':>8}{'extra':>7}{'err':>6}")
+
+    def report(name, cuts, seconds):
+        exact, missed, extra, error = cut_accuracy(reference, cuts)
+        print(f"{name:<24}{seconds:>9.2f}{base_seconds / seconds:>9.2f}{exact:>7}{missed:>8}{extra:>7}{error:>6.2f}")
+
+    report("SceneManager (current)", reference, base_seconds)
+    for downscale, stride in [(None, 1), (8, 1), (8, 2), (16, 4), (16, 8)]:
+        cuts, seconds = timed(fast_cuts, source, downscale, stride)
+        report(f"fast ds={downscale or 'auto'} stride={stride}", cuts, seconds)
+
+    exact, missed, extra, error = cut_accuracy(truth, reference)
+    print(f"SceneManager vs ground truth: {exact} exact, {missed} missed, {extra} extra")
+
+    remove_quietly(source)
+    os.rmdir(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures how segment-parallel encoding scales with the number of workers,
+for a straight copy, a reverse and a scene compile of a generated video.
+
+Run from the project folder (needs ffmpeg on the PATH to go past 1 worker):
+    python -m benchmarks.bench_segment_encoding --frames 3000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import make_synthetic_video, remove_quietly
+from ffmpeg_tools import find_ffmpeg
+from segment_encoder import encode_timeline, probe_video
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark segment-parallel encoding.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if not find_ffmpeg():
+        print("ffmpeg not found: every run will use a single in-process encoder.")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_segments_")
+    source = os.path.join(work_dir, "source.mp4")
+    output = os.path.join(work_dir, "output.mp4")
+    cuts = make_synthetic_video(source, args.width, args.height, args.frames)
+    fps, frame_size, frame_count = probe_video(source)
+
+    boundaries = [0] + cuts + [frame_count]
+    scenes = list(zip(boundaries, boundaries[1:]))
+    timelines = {
+        "merge": [(source, 0, frame_count, False)],
+        "reverse": [(source, 0, frame_count, True)],
+        "compile": [(source, start, end, False) for start, end in scenes[::2]],
+    }
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+
+    print(f"{frame_count} frames at {frame_size[0]}x{frame_size[1]}")
+    print(f"{'operation':<10}{'workers':>8}{'fps':>10}{'seconds':>10}{'scaling':>9}")
+    for name, timeline in timelines.items():
+        base_fps = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            frames = encode_timeline(timeline, output, fps, frame_size, workers=workers)
+            seconds = time.perf_counter() - start
+            encode_fps = frames / seconds if seconds > 0 else 0.0
+            base_fps = base_fps or encode_fps
+            print(f"{name:<10}{workers:>8}{encode_fps:>10.1f}{seconds:>10.2f}{encode_fps / base_fps:>9.2f}")
+            remove_quietly(output)
+
+    remove_quietly(source)
+    os.rmdir(work_dir)
+
+
+if __name__ == "__main__":
+    main()
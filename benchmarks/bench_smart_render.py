@@ -0,0 +1,89 @@
+"""
+Scene compile with full re-encoding against smart rendering (whole GOPs
+copied, only the cut edges re-encoded), on a generated H.264 video.
+Also checks that both outputs have exactly the frames asked for.
+
+Run from the project folder (needs ffmpeg and ffprobe on the PATH):
+    python -m benchmarks.bench_smart_render --frames 3000 --gop 60
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+
+from benchmarks.common import make_synthetic_video, remove_quietly
+from ffmpeg_tools import find_ffmpeg, find_ffprobe, run_ffmpeg
+from segment_encoder import encode_timeline, probe_video
+from smart_render import can_smart_render, smart_render
+
+
+def count_frames(video_file):
+    cap = cv2.VideoCapture(video_file)
+    count = 0
+    while cap.grab():
+        count += 1
+    cap.release()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark smart-render cuts against full re-encoding.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--gop", type=int, default=60, help="Keyframe interval of the generated source.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if not find_ffmpeg() or not find_ffprobe():
+        print("Smart rendering needs ffmpeg and ffprobe on the PATH.")
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="bench_smart_render_")
+    raw_source = os.path.join(work_dir, "raw.mp4")
+    source = os.path.join(work_dir, "source.mp4")
+    output = os.path.join(work_dir, "output.mp4")
+    # Cuts that don't line up with the GOPs, so every scene has edges to re-encode.
+    cuts = make_synthetic_video(raw_source, args.width, args.height, args.frames, scene_length=97)
+    run_ffmpeg(["-i", raw_source, "-c:v", "libx264", "-preset", "veryfast", "-g", str(args.gop),
+                "-keyint_min", str(args.gop), "-sc_threshold", "0", source])
+    remove_quietly(raw_source)
+
+    if not can_smart_render(source):
+        print("The generated source can't be smart-rendered (no keyframe index?).")
+        remove_quietly(source)
+        os.rmdir(work_dir)
+        return
+
+    fps, frame_size, frame_count = probe_video(source)
+    boundaries = [0] + cuts + [frame_count]
+    scenes = list(zip(boundaries, boundaries[1:]))[::2]
+    expected = sum(end - start for start, end in scenes)
+
+    runs = [
+        ("re-encode", lambda: encode_timeline([(source, start, end, False) for start, end in scenes],
+                                              output, fps, frame_size, workers=args.workers)),
+        ("smart", lambda: smart_render({output: [(source, start, end) for start, end in scenes]},
+                                       workers=args.workers)),
+    ]
+
+    print(f"{len(scenes)} scenes, {expected} of {frame_count} frames at {frame_size[0]}x{frame_size[1]}, GOP {args.gop}")
+    print(f"{'mode':<12}{'seconds':>10}{'fps':>10}{'speedup':>9}{'frames ok':>11}")
+    base_seconds = None
+    for name, render in runs:
+        start = time.perf_counter()
+        render()
+        seconds = time.perf_counter() - start
+        base_seconds = base_seconds or seconds
+        frames_ok = count_frames(output) == expected
+        print(f"{name:<12}{seconds:>10.2f}{expected / seconds:>10.1f}{base_seconds / seconds:>9.2f}{str(frames_ok):>11}")
+        remove_quietly(output)
+
+    remove_quietly(source)
+    os.rmdir(work_dir)
+
+
+if __name__ == "__main__":
+    main()
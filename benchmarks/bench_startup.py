@@ -0,0 +1,76 @@
+"""
+Measures app start-up: import cost and time until the window is first
+painted. Needs a display, since it really opens the window.
+
+Run from the project folder:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_app_start():
+    """Starts the app once with --measure-startup and returns its timings plus wall time."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "extract_frame.py", "--measure-startup"],
+                            cwd=PROJECT_DIR, capture_output=True, text=True, timeout=120)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+
+    timings = {"process_wall_ms": wall_ms}
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition("=")
+        if value:
+            timings[key] = float(value)
+    return timings
+
+
+def import_costs(statement):
+    """
+    Runs `statement` under -X importtime and returns {module: cumulative_ms}
+    for the modules it imported directly (not their sub-imports).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=PROJECT_DIR, capture_output=True, text=True, timeout=120)
+    costs = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level.
+        if module[1:2] == " ":
+            continue
+        costs[module.strip()] = int(cumulative) / 1000
+    return costs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app start-up.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="How many of the slowest imports to list.")
+    args = parser.parse_args()
+
+    app_imports = import_costs("import extract_frame")
+    print("Slowest imports when the app starts:")
+    for name, ms in sorted(app_imports.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<30}{ms:>10.1f} ms")
+
+    heavy = import_costs("import cv2, PIL.ImageTk, scenedetect, scenedetect.detectors")
+    deferred_ms = sum(heavy.values())
+    print(f"Deferred until first use (cv2, PIL.ImageTk, scenedetect): {deferred_ms:.1f} ms")
+
+    runs = [measure_app_start() for _ in range(args.runs)]
+    print(f"\nMedian of {args.runs} runs:")
+    for key in runs[0]:
+        print(f"  {key:<22}{statistics.median(run[key] for run in runs):>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
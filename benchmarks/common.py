@@ -0,0 +1,133 @@
+"""
+Shared helpers for the benchmark scripts: synthetic test videos, peak memory
+measurement and running a measurement in a fresh process.
+"""
+import multiprocessing
+import os
+import queue as queue_module
+import sys
+import time
+
+import cv2
+import numpy as np
+
+
+def make_synthetic_video(path, width=640, height=360, frame_count=300, fps=30.0, scene_length=60):
+    """
+    Writes a test video made of solid-colour "scenes" with a moving box, so
+    every frame is different and there is a hard cut every scene_length frames.
+    Returns the list of cut frame numbers.
+    """
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(path, fourcc, fps, (width, height))
+    if not out.isOpened():
+        raise IOError(f"Could not create synthetic video: {path}")
+
+    rng = np.random.default_rng(1234)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    box = max(8, min(width, height) // 6)
+    cuts = []
+    colour = rng.integers(0, 256, size=3)
+
+    for i in range(frame_count):
+        if i > 0 and i % scene_length == 0:
+            cuts.append(i)
+            colour = rng.integers(0, 256, size=3)
+        frame[:] = colour
+        x = (i * 7) % max(1, width - box)
+        y = (i * 3) % max(1, height - box)
+        frame[y:y + box, x:x + box] = 255 - colour
+        out.write(frame)
+
+    out.release()
+    return cuts
+
+
+def peak_rss_bytes(who=None):
+    """
+    Peak resident set size of the current process, or None if unknown.
+    who="children" gives the largest of its finished child processes
+    (process pool workers, ffmpeg) instead; that needs the resource module.
+    """
+    try:
+        import resource
+        usage = resource.RUSAGE_CHILDREN if who == "children" else resource.RUSAGE_SELF
+        peak = resource.getrusage(usage).ru_maxrss
+        # Linux reports kilobytes, macOS reports bytes.
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        if who == "children":
+            return None
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    except ImportError:
+        return None
+
+
+def _measure_child(func, args, queue):
+    start = time.perf_counter()
+    try:
+        frames = func(*args)
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+        return
+    elapsed = time.perf_counter() - start
+    own, children = peak_rss_bytes(), peak_rss_bytes("children")
+    # Pool workers and ffmpeg do much of the work, so count the biggest of them too.
+    queue.put({"frames": frames, "seconds": elapsed, "peak_rss_self": own, "peak_rss_children": children,
+               "peak_rss": None if own is None else own + (children or 0)})
+
+
+def measure_in_subprocess(func, *args, timeout=None):
+    """
+    Runs func(*args) in a fresh process so its peak memory isn't mixed up
+    with other runs. func must return the number of frames it processed.
+    Returns a dict with frames, seconds, fps and peak_rss (the process's
+    own peak plus that of its largest child process; peak_rss_self and
+    peak_rss_children hold the two parts). Raises RuntimeError if func
+    raised, the process died or it ran for longer than timeout seconds.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure_child, args=(func, args, queue))
+    process.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                result = queue.get(timeout=1.0)
+                break
+            except queue_module.Empty:
+                pass
+            if not process.is_alive():
+                # It may have put its result just before exiting.
+                try:
+                    result = queue.get(timeout=1.0)
+                    break
+                except queue_module.Empty:
+                    raise RuntimeError(f"Benchmark process exited with code {process.exitcode} without a result")
+            if deadline is not None and time.monotonic() > deadline:
+                raise RuntimeError(f"Benchmark process timed out after {timeout} s")
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    result["fps"] = result["frames"] / result["seconds"] if result["seconds"] > 0 else 0.0
+    return result
+
+
+def format_bytes(num_bytes):
+    if num_bytes is None:
+        return "n/a"
+    return f"{num_bytes / (1024 * 1024):.1f} MB"
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,263 @@
+"""
+Benchmark suite for every video operation, with results saved as JSON.
+
+For every combination of resolution, length and scene length it writes a
+synthetic test video (solid-colour scenes with hard cuts, see
+common.make_synthetic_video), then:
+
+- runs each operation headless through video_ops, in a fresh process,
+  and records wall time, frames per second and peak RSS (its own plus
+  its largest child process, e.g. a pool worker or ffmpeg);
+- times the per-frame stages on their own in one pass over the video:
+  decode, scene detection, resize and encode.
+
+Results go to a JSON file along with the environment (Python, OpenCV and
+NumPy versions, CPU count, whether ffmpeg was found, git revision), so two
+runs can be compared. --compare prints the fps change of every
+measurement against an earlier results file.
+
+Run from the project folder:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --quick --compare results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import video_ops
+from benchmarks.common import format_bytes, make_synthetic_video, measure_in_subprocess
+from ffmpeg_tools import find_ffmpeg
+from scene_analysis import build_scene_list, default_downscale, detect_frame, detection_frame
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OPERATIONS = ["extract_last_frame", "reverse", "merge", "detect_scenes", "compile", "save_scenes", "auto_clip"]
+
+
+def _scene_list(source, cuts):
+    cap = cv2.VideoCapture(source)
+    fps, frame_count = cap.get(cv2.CAP_PROP_FPS), int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return build_scene_list(cuts, 0, frame_count, fps), frame_count
+
+
+def run_operation(name, source, cuts, output_dir, options):
+    """Runs one operation on source. Returns the number of frames it processed."""
+    scene_list, frame_count = _scene_list(source, cuts)
+    selected = list(range(0, len(scene_list), 2)) # Every other scene
+    selected_frames = sum(scene_list[i][1].get_frames() - scene_list[i][0].get_frames() for i in selected)
+
+    if name == "extract_last_frame":
+        video_ops.extract_last_frame(source, output_dir)
+        return 1
+    if name == "reverse":
+        video_ops.reverse_clip(source, output_dir, options)
+        return frame_count
+    if name == "merge":
+        video_ops.merge_clips([source, source], output_dir, options)
+        return frame_count * 2
+    if name == "detect_scenes":
+        video_ops.detect_scenes(source, options)
+        return frame_count
+    if name in ("compile", "save_scenes") and not selected:
+        return 0 # No cuts in this video
+    if name == "compile":
+        video_ops.compile_scenes(source, scene_list, selected, output_dir, options)
+        return selected_frames
+    if name == "save_scenes":
+        video_ops.save_scenes(source, scene_list, selected, output_dir, options)
+        return selected_frames
+    if name == "auto_clip":
+        video_ops.auto_clip(source, output_dir, options)
+        return frame_count
+    raise ValueError(f"Unknown operation: {name}")
+
+
+def profile_stages(source, output_path, scene_detector):
+    """
+    Decodes source once and times each per-frame stage on its own: decode,
+    scene detection (on the downscaled detection frame), resize to half
+    size and encode. Returns {stage: {"seconds", "fps"}}.
+    """
+    options = video_ops.VideoOptions()
+    options.scene_detector = scene_detector
+    detector = video_ops.make_detector(options)
+
+    cap = cv2.VideoCapture(source)
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    downscale = default_downscale(width)
+    half = np.empty((height // 2, width // 2, 3), dtype=np.uint8)
+    seconds = {"decode": 0.0, "detect": 0.0, "resize": 0.0, "encode": 0.0}
+    frames = 0
+
+    try:
+        while True:
+            t0 = time.perf_counter()
+            ret, frame = cap.read()
+            t1 = time.perf_counter()
+            if not ret:
+                break
+            detect_frame(detector, frames, detection_frame(frame, downscale), fps)
+            t2 = time.perf_counter()
+            cv2.resize(frame, (width // 2, height // 2), dst=half, interpolation=cv2.INTER_AREA)
+            t3 = time.perf_counter()
+            out.write(frame)
+            t4 = time.perf_counter()
+            seconds["decode"] += t1 - t0
+            seconds["detect"] += t2 - t1
+            seconds["resize"] += t3 - t2
+            seconds["encode"] += t4 - t3
+            frames += 1
+    finally:
+        cap.release()
+        out.release()
+
+    return {stage: {"seconds": round(s, 4), "fps": round(frames / s, 1) if s > 0 else None}
+            for stage, s in seconds.items()}
+
+
+def environment():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                                  capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": bool(find_ffmpeg()),
+        "revision": revision,
+    }
+
+
+def parse_list(text, convert=int):
+    return [convert(item) for item in text.split(",") if item.strip()]
+
+
+def parse_resolution(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def measurement_key(entry):
+    video = entry["video"]
+    return f"{video['width']}x{video['height']}/{video['frames']}f/{video['scene_length']}sl/{entry['name']}"
+
+
+def compare(baseline_path, results):
+    """Prints the fps change of every measurement that is also in the baseline results."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = {measurement_key(entry): entry["fps"] for entry in baseline["operations"] + baseline["stages"]}
+    print(f"\nAgainst {baseline_path} (revision {baseline['environment'].get('revision')}):")
+    print(f"{'measurement':<48}{'fps before':>12}{'fps now':>10}{'change':>9}")
+    for entry in results["operations"] + results["stages"]:
+        key = measurement_key(entry)
+        old_fps = before.get(key)
+        if not old_fps or not entry["fps"]:
+            continue
+        print(f"{key:<48}{old_fps:>12.1f}{entry['fps']:>10.1f}{(entry['fps'] / old_fps - 1) * 100:>8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every video operation on synthetic videos.")
+    parser.add_argument("--resolutions", default="640x360,1280x720,1920x1080")
+    parser.add_argument("--lengths", default="300,900", help="Frame counts of the test videos.")
+    parser.add_argument("--scene-lengths", default="30,150", help="Frames between cuts (fewer = more scenes).")
+    parser.add_argument("--operations", default=",".join(OPERATIONS))
+    parser.add_argument("--detector", choices=["content", "batch"], default="content")
+    parser.add_argument("--workers", type=int, default=None, help="Encode/export processes (default: all CPUs).")
+    parser.add_argument("--quick", action="store_true", help="One small video only.")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds before an operation counts as failed.")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.resolutions, args.lengths, args.scene_lengths = "640x360", "300", "30"
+    operations = parse_list(args.operations, str)
+    for name in operations:
+        if name not in OPERATIONS:
+            parser.error(f"Unknown operation: {name}")
+
+    options = video_ops.VideoOptions()
+    options.scene_detector = args.detector
+    if args.workers:
+        options.encode_workers = options.export_workers = args.workers
+
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": {"detector": args.detector, "encode_workers": options.encode_workers,
+                     "export_workers": options.export_workers},
+        "operations": [],
+        "stages": [],
+    }
+
+    work_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    source = os.path.join(work_dir, "source.mp4")
+    output_dir = os.path.join(work_dir, "output")
+    print(f"{'video':<28}{'measurement':<20}{'fps':>10}{'seconds':>10}{'peak RSS':>14}")
+    try:
+        for width, height in (parse_resolution(r) for r in args.resolutions.split(",")):
+            for frames in parse_list(args.lengths):
+                for scene_length in parse_list(args.scene_lengths):
+                    cuts = make_synthetic_video(source, width, height, frames, scene_length=scene_length)
+                    video = {"width": width, "height": height, "frames": frames,
+                             "scene_length": scene_length, "scenes": len(cuts) + 1}
+                    label = f"{width}x{height} {frames}f {len(cuts) + 1} scenes"
+
+                    for name in operations:
+                        os.makedirs(output_dir, exist_ok=True)
+                        try:
+                            result = measure_in_subprocess(run_operation, name, source, cuts, output_dir, options,
+                                                           timeout=args.timeout)
+                        except RuntimeError as e:
+                            # Keep going; the failure is recorded with the results.
+                            results["operations"].append({"video": video, "name": name, "fps": None, "error": str(e)})
+                            print(f"{label:<28}{name:<20}  failed: {e}")
+                            continue
+                        finally:
+                            shutil.rmtree(output_dir, ignore_errors=True)
+                        entry = {"video": video, "name": name, "frames": result["frames"],
+                                 "seconds": round(result["seconds"], 4), "fps": round(result["fps"], 1),
+                                 "peak_rss": result["peak_rss"], "peak_rss_children": result["peak_rss_children"]}
+                        results["operations"].append(entry)
+                        print(f"{label:<28}{name:<20}{entry['fps']:>10.1f}{entry['seconds']:>10.2f}"
+                              f"{format_bytes(entry['peak_rss']):>14}")
+
+                    stage_output = os.path.join(work_dir, "stages.mp4")
+                    for stage, timing in profile_stages(source, stage_output, args.detector).items():
+                        entry = {"video": video, "name": f"stage_{stage}", "seconds": timing["seconds"],
+                                 "fps": timing["fps"]}
+                        results["stages"].append(entry)
+                        print(f"{label:<28}{'stage ' + stage:<20}{timing['fps'] or 0:>10.1f}{timing['seconds']:>10.2f}")
+                    os.remove(stage_output)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(args.compare, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
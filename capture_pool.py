@@ -0,0 +1,198 @@
+"""
+Shared pool of open VideoCapture handles, with cached probe metadata.
+
+Opening a cv2.VideoCapture parses the container every time, and every
+operation used to open its own and re-read the fps and frame size. The
+pool keeps handles open after use (up to max_open, least recently used
+closed first) and hands them out again for the same file, rewound to the
+first frame. Probe results and keyframe indexes are cached per file and
+dropped when the file's size or modification time changes.
+
+A handle is only ever used by one caller at a time; two threads working
+on the same file get two handles. Each process has its own pool.
+"""
+import collections
+import contextlib
+import os
+import threading
+
+import cv2
+
+from keyframe_index import KeyframeCache
+from metrics import shared_metrics
+
+DEFAULT_MAX_OPEN = 8
+
+
+class VideoInfo:
+    """What OpenCV reports for a file when it is opened."""
+
+    def __init__(self, fps, width, height, frame_count):
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.frame_count = frame_count # An estimate for some containers; can be 0
+
+    @property
+    def frame_size(self):
+        return self.width, self.height
+
+
+def _file_key(video_file):
+    """Identifies one version of a file; a changed file gets new handles and metadata."""
+    stat = os.stat(video_file)
+    return os.path.abspath(video_file), stat.st_size, stat.st_mtime_ns
+
+
+class CapturePool:
+    def __init__(self, max_open=DEFAULT_MAX_OPEN, keyframe_cache=None):
+        self.max_open = max_open
+        self.keyframe_cache = keyframe_cache or KeyframeCache()
+        self._lock = threading.Lock()
+        self._idle = collections.OrderedDict() # file key -> idle handles, least recently used first
+        self._in_use = {} # id(handle) -> file key
+        self._info = {} # file key -> VideoInfo
+        self._keyframes = {} # file key -> KeyframeIndex, or None if the file has none
+
+    def acquire(self, video_file):
+        """
+        Returns an open capture for video_file positioned at its first frame.
+        Raises IOError if the file can't be opened. Hand it back with release().
+        """
+        try:
+            key = _file_key(video_file)
+        except OSError:
+            raise IOError(f"Could not open video file: {video_file}")
+
+        with self._lock:
+            handles = self._idle.get(key)
+            cap = handles.pop() if handles else None
+            if handles is not None and not handles:
+                del self._idle[key]
+            if cap is not None:
+                self._in_use[id(cap)] = key
+
+        metrics = shared_metrics()
+        if cap is not None:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            metrics.count("capture_reuses")
+            return cap
+
+        with metrics.timer("capture_open"):
+            cap = cv2.VideoCapture(video_file)
+        metrics.count("capture_opens")
+        if not cap.isOpened():
+            cap.release()
+            raise IOError(f"Could not open video file: {video_file}")
+
+        with self._lock:
+            if key not in self._info:
+                self._info[key] = VideoInfo(cap.get(cv2.CAP_PROP_FPS),
+                                            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                            int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+            self._in_use[id(cap)] = key
+            to_close = self._trim()
+        for old in to_close:
+            old.release()
+        return cap
+
+    def release(self, cap):
+        """Hands a capture back to the pool, where it stays open for the next user."""
+        with self._lock:
+            key = self._in_use.pop(id(cap), None)
+            if key is not None:
+                self._idle.setdefault(key, []).append(cap)
+                self._idle.move_to_end(key)
+            to_close = self._trim()
+        if key is None:
+            # Not one of ours: just close it.
+            cap.release()
+        for old in to_close:
+            old.release()
+
+    @contextlib.contextmanager
+    def capture(self, video_file):
+        """`with pool.capture(path) as cap:` - acquire() and release() around a block."""
+        cap = self.acquire(video_file)
+        try:
+            yield cap
+        finally:
+            self.release(cap)
+
+    def info(self, video_file):
+        """Returns the cached VideoInfo for video_file, opening it once if needed."""
+        try:
+            key = _file_key(video_file)
+        except OSError:
+            raise IOError(f"Could not open video file: {video_file}")
+        with self._lock:
+            info = self._info.get(key)
+        while info is None:
+            # Opening it leaves a warm handle behind for whoever reads it next.
+            # A clear() in between can drop the info again, hence the loop.
+            self.release(self.acquire(video_file))
+            with self._lock:
+                info = self._info.get(key)
+        return info
+
+    def keyframes(self, video_file):
+        """Returns the KeyframeIndex for video_file (built on first use), or None if there is none."""
+        key = _file_key(video_file)
+        with self._lock:
+            if key in self._keyframes:
+                return self._keyframes[key]
+        index = self.keyframe_cache.load(video_file)
+        with self._lock:
+            self._keyframes[key] = index
+        return index
+
+    def exact_frame_count(self, video_file):
+        """
+        The frame count from the keyframe index, which is counted from the
+        packets, or 0 if there is no index. Unlike VideoInfo.frame_count it
+        is safe to plan a timeline with.
+        """
+        index = self.keyframes(video_file)
+        return index.frame_count if index else 0
+
+    def _trim(self):
+        """Takes the least recently used idle handles out until we're within max_open. Call with the lock held."""
+        to_close = []
+        open_count = len(self._in_use) + sum(len(handles) for handles in self._idle.values())
+        while open_count > self.max_open and self._idle:
+            key, handles = next(iter(self._idle.items()))
+            to_close.append(handles.pop(0))
+            if not handles:
+                del self._idle[key]
+            open_count -= 1
+        return to_close
+
+    def clear(self):
+        """
+        Closes every idle handle and forgets the metadata of files that have
+        no handle checked out. Handles still in use come back to the pool as
+        usual, so it is safe to call while operations are running; the app
+        and the CLI call it when they shut down.
+        """
+        with self._lock:
+            to_close = [cap for handles in self._idle.values() for cap in handles]
+            self._idle.clear()
+            in_use = set(self._in_use.values())
+            self._info = {key: info for key, info in self._info.items() if key in in_use}
+            self._keyframes.clear()
+        for cap in to_close:
+            cap.release()
+
+
+_shared_pool = CapturePool()
+
+
+def shared_pool():
+    """The pool used by every operation in this process."""
+    return _shared_pool
+
+
+def configure(max_open):
+    """Sets how many captures the shared pool may keep open."""
+    _shared_pool.max_open = max(1, int(max_open))
@@ -0,0 +1,264 @@
+"""
+Headless command line and batch entry point for the video operations.
+
+Inputs are file paths or glob patterns ("**" recurses), or a manifest file
+with one input per line. For merge, each manifest line is one merge job
+with its clips separated by "|". Files are processed concurrently by a
+job-level worker pool.
+
+Examples:
+    python cli.py extract-last-frame "D:/clips/*.mp4"
+    python cli.py reverse --manifest jobs.txt --jobs 4
+    python cli.py merge intro.mp4 main.mp4 outro.mp4
+    python cli.py auto-clip "recordings/**/*.mkv" --jobs 2
+    python cli.py auto-clip long_recording.mp4 --incremental
+    python cli.py compile talk.mp4 --scenes 1,3,5
+    python cli.py compile talk.mp4 --separate
+    python cli.py reverse clip.mp4 --metrics-out metrics.json
+"""
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+
+import video_ops
+from job_queue import JobScheduler
+from metrics import shared_metrics
+from scene_cache import SceneCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_print_lock = threading.Lock()
+
+
+def report(message):
+    with _print_lock:
+        print(message, flush=True)
+
+
+def expand_inputs(patterns):
+    """Expands glob patterns, keeping order and dropping duplicates."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def read_manifest(manifest_path):
+    """Returns the non-empty, non-comment lines of a manifest file."""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+
+def parse_scene_numbers(text):
+    """Turns "1,3,5-7" into zero-based scene indices [0, 2, 4, 5, 6]."""
+    indices = []
+    for part in text.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = part.split("-", 1)
+            indices.extend(range(int(first) - 1, int(last)))
+        elif part:
+            indices.append(int(part) - 1)
+    return indices
+
+
+def parse_size(text):
+    """'1280x720' -> (1280, 720)."""
+    try:
+        width, height = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got '{text}'.")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"Expected a positive size, got '{text}'.")
+    return width, height
+
+
+def build_options(args):
+    options = video_ops.VideoOptions()
+    # Share the CPU between the concurrent jobs unless told otherwise.
+    per_job_workers = args.workers or max(1, (os.cpu_count() or 1) // args.jobs)
+    options.encode_workers = per_job_workers
+    options.export_workers = per_job_workers
+    options.reverse_memory_limit = args.memory_limit_mb * 1024 * 1024
+    options.reverse_strategy = args.reverse_strategy
+    options.merge_mode = args.merge_mode
+    options.merge_size = args.merge_size
+    options.merge_fps = args.merge_fps
+    options.merge_fit = args.merge_fit
+    options.frame_cache_bytes = args.frame_cache_mb * 1024 * 1024
+    options.cut_mode = args.cut_mode
+    if args.two_pass:
+        options.auto_clip_mode = "two_pass"
+    elif args.incremental:
+        options.auto_clip_mode = "incremental"
+    options.scene_detector = args.detector
+    options.analysis_downscale = args.downscale
+    options.analysis_stride = args.stride
+    return options
+
+
+def build_jobs(args, options, scene_cache):
+    """Returns a list of (label, callable) jobs for the chosen command; each callable takes a progress_callback."""
+    output_root = args.output_dir
+    if args.manifest:
+        entries = read_manifest(args.manifest)
+    else:
+        entries = expand_inputs(args.inputs)
+
+    if args.command == "merge":
+        if args.manifest:
+            groups = [expand_inputs([clip.strip() for clip in line.split("|")]) for line in entries]
+        else:
+            groups = [entries]
+        output_dir = os.path.join(output_root, video_ops.MERGED_DIR)
+        return [(" + ".join(os.path.basename(c) for c in group),
+                 lambda progress, group=group: video_ops.merge_clips(group, output_dir, options, progress))
+                for group in groups if group]
+
+    jobs = []
+    for video_file in entries:
+        if args.command == "extract-last-frame":
+            output_dir = os.path.join(output_root, video_ops.LAST_FRAME_DIR)
+            job = lambda progress, f=video_file: video_ops.extract_last_frame(f, output_dir, args.output_name)
+        elif args.command == "reverse":
+            output_dir = os.path.join(output_root, video_ops.REVERSED_DIR)
+            job = lambda progress, f=video_file: video_ops.reverse_clip(f, output_dir, options, progress)
+        elif args.command == "auto-clip":
+            output_dir = os.path.join(output_root, video_ops.COMPILED_DIR)
+            job = lambda progress, f=video_file: _auto_clip(f, output_dir, options, scene_cache, progress)
+        else:
+            output_dir = os.path.join(output_root, video_ops.COMPILED_DIR)
+            job = lambda progress, f=video_file: _compile(f, output_dir, options, scene_cache, args.scenes,
+                                                          args.separate, progress)
+        jobs.append((video_file, job))
+    return jobs
+
+
+def _auto_clip(video_file, output_dir, options, scene_cache, progress_callback):
+    scene_list, output_path = video_ops.auto_clip(video_file, output_dir, options, scene_cache, progress_callback)
+    if not output_path:
+        return "no significant scene changes"
+    return f"{len(scene_list)} scenes -> {output_path}"
+
+
+def _compile(video_file, output_dir, options, scene_cache, scenes, separate, progress_callback):
+    scene_list = video_ops.detect_scenes(video_file, options, scene_cache)
+    if not scene_list:
+        return "no significant scene changes"
+    selected = parse_scene_numbers(scenes) if scenes else list(range(len(scene_list)))
+    selected = [i for i in selected if 0 <= i < len(scene_list)]
+    if separate:
+        folder = os.path.join(output_dir, os.path.splitext(os.path.basename(video_file))[0])
+        video_ops.save_scenes(video_file, scene_list, selected, folder, options, progress_callback)
+        return f"{len(selected)} scenes -> {folder}"
+    return video_ops.compile_scenes(video_file, scene_list, selected, output_dir, options, progress_callback)
+
+
+def run_jobs(jobs, max_jobs):
+    """
+    Runs the jobs on the job scheduler (OpenCV releases the GIL while it
+    works). Ctrl+C cancels whatever is still queued or running. Returns
+    the number of jobs that didn't succeed.
+    """
+    scheduler = JobScheduler(max_workers=max_jobs)
+    failures = []
+
+    def on_done(job):
+        report(f"OK    {job.name}: {job.result}")
+
+    def on_error(job):
+        failures.append(job)
+        report(f"{'CANCEL' if job.state == 'cancelled' else 'FAIL':<6}{job.name}: {job.error or 'not started'}")
+
+    for label, job in jobs:
+        scheduler.submit(label, job, on_done=on_done, on_error=on_error)
+
+    try:
+        while True:
+            try:
+                while scheduler.active_jobs():
+                    scheduler.poll()
+                    time.sleep(0.1)
+                break
+            except KeyboardInterrupt:
+                report("Cancelling...")
+                scheduler.cancel_all()
+    finally:
+        scheduler.poll()
+        scheduler.shutdown(wait=True)
+    return len(failures)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Video Utilities without the GUI.")
+    parser.add_argument("command", choices=["extract-last-frame", "merge", "reverse", "auto-clip", "compile"])
+    parser.add_argument("inputs", nargs="*", help="Video files or glob patterns.")
+    parser.add_argument("--manifest", help="Text file with one input per line (merge: clips separated by '|').")
+    parser.add_argument("--output-dir", default=BASE_DIR, help="Root folder for the output folders.")
+    parser.add_argument("--jobs", type=int, default=1, help="Files processed at the same time.")
+    parser.add_argument("--workers", type=int, default=None, help="Encode/export processes per job.")
+    parser.add_argument("--output-name", default="last_frame.png", help="Image name for extract-last-frame.")
+    parser.add_argument("--memory-limit-mb", type=int, default=video_ops.DEFAULT_MEMORY_LIMIT // (1024 * 1024))
+    parser.add_argument("--reverse-strategy", choices=["seek", "spill"], default="seek")
+    parser.add_argument("--frame-cache-mb", type=int, default=0,
+                        help="Disk space for decoded frames reused by later jobs on the same clip (0 = off).")
+    parser.add_argument("--merge-mode", choices=["auto", "reencode"], default="auto")
+    parser.add_argument("--merge-size", type=parse_size, default=None,
+                        help="merge: output size as WIDTHxHEIGHT (default: the first clip's).")
+    parser.add_argument("--merge-fps", type=float, default=None, help="merge: output frame rate (default: the first clip's).")
+    parser.add_argument("--merge-fit", choices=["letterbox", "stretch"], default="letterbox",
+                        help="merge: how clips of another shape are fitted to the output size.")
+    parser.add_argument("--cut-mode", choices=["auto", "reencode"], default="auto",
+                        help="compile: copy whole GOPs and re-encode only the cut edges when possible.")
+    parser.add_argument("--two-pass", action="store_true", help="Detect scenes first, then compile.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="auto-clip: save each scene as soon as it is found, then join them.")
+    parser.add_argument("--detector", choices=["content", "batch"], default="content",
+                        help="Scene detector: PySceneDetect's ContentDetector or the vectorized batch detector.")
+    parser.add_argument("--downscale", type=int, default=None, help="Scene detection downscale factor.")
+    parser.add_argument("--stride", type=int, default=1, help="Run scene detection on every Nth frame.")
+    parser.add_argument("--scenes", help="compile: scene numbers to keep, e.g. 1,3,5-7.")
+    parser.add_argument("--separate", action="store_true", help="compile: save each scene as its own file.")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the scene cache.")
+    parser.add_argument("--max-open-files", type=int, default=None,
+                        help="Video files kept open for reuse between operations (default 8).")
+    parser.add_argument("--metrics-out", help="Write decode/detect/encode timings and counters to this JSON file.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.inputs and not args.manifest:
+        report("No inputs given.")
+        return 2
+    args.jobs = max(1, args.jobs)
+
+    if args.max_open_files:
+        import capture_pool
+        capture_pool.configure(args.max_open_files)
+
+    options = build_options(args)
+    scene_cache = None if args.no_cache else SceneCache(os.path.join(args.output_dir, video_ops.SCENE_CACHE_DIR))
+    jobs = build_jobs(args, options, scene_cache)
+    if not jobs:
+        report("No matching input files.")
+        return 2
+
+    failures = run_jobs(jobs, args.jobs)
+    from capture_pool import shared_pool
+    shared_pool().clear()
+    report(f"{len(jobs) - failures} succeeded, {failures} failed.")
+    if args.metrics_out:
+        shared_metrics().dump(args.metrics_out)
+        report(f"Metrics written to {args.metrics_out}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,29 @@
-import cv2
+import time
+STARTUP_TIME = time.perf_counter() # Taken before the other imports so --measure-startup can time them
+
 import os
-import re
+import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from PIL import Image, ImageTk
-import threading
 
-# PySceneDetect imports - updated to use open_video
-from scenedetect import open_video, SceneManager
-from scenedetect.detectors import ContentDetector
+# cv2, PIL and scenedetect are imported where they are first needed, so
+# the window can appear without waiting for them to load.
+import video_ops
+from job_queue import JobScheduler
+from progress_view import JobProgressWindow
+from scene_cache import SceneCache
+
+IMPORTS_DONE_TIME = time.perf_counter()
+
+JOB_POLL_MS = 50 # How often job results and progress are picked up on the Tk thread
+FRAME_CACHE_BYTES = 4 * 1024 * 1024 * 1024 # Decoded frames kept on disk for repeated edits, when turned on
 
 
 class VideoUtilityApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Video Utilities")
-        self.geometry("600x800") # Increased window height for the new button
+        self.geometry("600x850") # Increased window height for the new buttons
         self.configure(bg="#2c3e50") # Dark background
         
         # Define the base directory relative to the script's location
@@ -23,19 +31,36 @@ class VideoUtilityApp(tk.Tk):
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
 
         # Video playback properties
-        self.cap = None
+        self.player = None # PlaybackEngine decoding the current clip in the background
         self.is_playing = False
         self.after_id = None # To manage the after() loop
         self.last_frame = None # To store the last frame for resizing events
-        self.video_delay = 25 # Default delay in ms for video playback
+        self.renderer = None # FrameRenderer shared by the video and preview labels, created on first use
+        self.playing_file = None # Clip (original path) currently playing
+
+        # Low-resolution preview proxies, made in the background as clips are added
+        self.proxy_generator = None # ProxyGenerator, created on first use
+        self.proxy_paths = {} # original path -> (proxy path, poster path)
         
         # UI elements
         self.output_filename = tk.StringVar(value="last_frame.png")
+        self.playback_stats = tk.StringVar(value="") # Achieved FPS and dropped frames
 
         # Clip editor properties
         self.clip_list = []
 
+        # Processing options and the scene list cache
+        self.options = video_ops.VideoOptions()
+        self.use_frame_cache = tk.BooleanVar(value=False) # Off by default: it can write gigabytes per clip
+        self.scene_cache = SceneCache(os.path.join(self.base_dir, video_ops.SCENE_CACHE_DIR))
+
+        # Long-running operations go through one bounded job queue
+        self.jobs = JobScheduler(max_workers=self.options.max_jobs)
+        self.stats_window = None # StatsWindow, while it's open
+
         self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._poll_jobs()
 
     def setup_ui(self):
         """Sets up the UI for the entire application using a grid layout."""
@@ -64,6 +89,7 @@ class VideoUtilityApp(tk.Tk):
         listbox_frame.columnconfigure(1, weight=1, minsize=150)
         
         tk.Label(listbox_frame, text="Selected Clips:", bg="#2c3e50", fg="#ecf0f1", font=("Arial", 12, "bold")).grid(row=0, column=0, pady=(0, 5), sticky="w")
+        tk.Label(listbox_frame, textvariable=self.playback_stats, bg="#2c3e50", fg="#95a5a6", font=("Arial", 9)).grid(row=0, column=1, pady=(0, 5), sticky="e")
         
         self.clip_listbox = tk.Listbox(listbox_frame, bg="#34495e", fg="#ecf0f1", selectbackground="#3498db", relief=tk.FLAT, height=5)
         self.clip_listbox.grid(row=1, column=0, sticky="nsew")
@@ -98,6 +124,8 @@ class VideoUtilityApp(tk.Tk):
 
         tk.Label(output_frame, text="Output File Name:", bg="#2c3e50", fg="#ecf0f1", font=("Arial", 12, "bold")).grid(row=0, column=0, pady=(0, 5), sticky="w")
         tk.Entry(output_frame, textvariable=self.output_filename, relief=tk.FLAT).grid(row=0, column=1, padx=(5, 0), ipady=3, sticky="ew")
+        tk.Checkbutton(output_frame, text="Cache decoded frames for repeated edits (up to 4 GB on disk)", variable=self.use_frame_cache, command=self.on_frame_cache_toggle,
+                       bg="#2c3e50", fg="#ecf0f1", selectcolor="#34495e", activebackground="#2c3e50", activeforeground="#ecf0f1", font=("Arial", 9)).grid(row=1, column=0, columnspan=2, pady=(5, 0), sticky="w")
 
         action_buttons_frame = tk.Frame(self, bg="#2c3e50")
         action_buttons_frame.grid(row=4, column=0, pady=20, padx=10, sticky="ew")
@@ -110,6 +138,20 @@ class VideoUtilityApp(tk.Tk):
         tk.Button(action_buttons_frame, text="Reverse Clip", command=self.reverse_clip, bg="#3498db", fg="#ecf0f1", relief=tk.FLAT, font=("Arial", 12, "bold")).grid(row=0, column=2, padx=5, sticky="ew")
         
         tk.Button(action_buttons_frame, text="✨ AI Auto Clip ✨", command=self.ai_auto_clip, bg="#9b59b6", fg="#ecf0f1", relief=tk.FLAT, font=("Arial", 12, "bold")).grid(row=1, column=0, columnspan=3, pady=(10,0), padx=5, sticky="ew")
+        tk.Button(action_buttons_frame, text="Extract Last Frame of All Clips", command=self.extract_all_frames, bg="#16a085", fg="#ecf0f1", relief=tk.FLAT, font=("Arial", 12, "bold")).grid(row=2, column=0, columnspan=3, pady=(10,0), padx=5, sticky="ew")
+        tk.Button(action_buttons_frame, text="Stats", command=self.show_stats, bg="#7f8c8d", fg="#ecf0f1", relief=tk.FLAT, font=("Arial", 10, "bold")).grid(row=3, column=0, columnspan=3, pady=(10,0), padx=5, sticky="ew")
+
+    def on_frame_cache_toggle(self):
+        """Turns the decoded-frame cache on or off for the operations started from now on."""
+        self.options.frame_cache_bytes = FRAME_CACHE_BYTES if self.use_frame_cache.get() else 0
+
+    def show_stats(self):
+        """Opens the live stats window, or raises it if it's already open."""
+        from stats_view import StatsWindow
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        self.stats_window = StatsWindow(self)
 
     def stop_video(self):
         """Stops the current video playback and clears both video labels."""
@@ -117,15 +159,18 @@ class VideoUtilityApp(tk.Tk):
         if self.after_id:
             self.after_cancel(self.after_id)
             self.after_id = None
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        if self.player:
+            self.player.stop()
+            self.player = None
+        self.playing_file = None
         if self.video_label:
             self.video_label.config(image=None)
             self.video_label.image = None
         if self.preview_label:
             self.preview_label.config(image=None)
             self.preview_label.image = None
+        if self.renderer:
+            self.renderer.forget()
 
     def on_clip_select(self, event):
         """Plays the selected video clip automatically when selected in the listbox."""
@@ -137,24 +182,62 @@ class VideoUtilityApp(tk.Tk):
         self.play_video(file_path)
 
     def play_video(self, video_file):
-        """Plays the video file in the GUI."""
+        """Plays the video file in the GUI, from its preview proxy when one is ready."""
         self.stop_video()
         
         if not os.path.exists(video_file):
             messagebox.showerror("Error", f"The file '{video_file}' was not found.")
             return
 
-        self.cap = cv2.VideoCapture(video_file)
-        if not self.cap.isOpened():
-            messagebox.showerror("Error", "Could not open the video file for playback.")
+        from playback import PlaybackEngine
+
+        preview_file, poster_file = self.proxy_paths.get(video_file, (video_file, None))
+        if poster_file and not (os.path.exists(preview_file) and os.path.exists(poster_file)):
+            # Evicted from the proxy cache since it was made: play the original and make it again.
+            del self.proxy_paths[video_file]
+            preview_file, poster_file = video_file, None
+            self._request_proxy(video_file)
+        if poster_file:
+            self._show_poster(poster_file)
+
+        # Decoding happens on the engine's own thread; the main loop only displays.
+        self.player = PlaybackEngine(preview_file)
+        try:
+            self.player.start()
+        except IOError as e:
+            self.player = None
+            messagebox.showerror("Error", str(e))
             return
-        
-        fps = self.cap.get(cv2.CAP_PROP_FPS)
-        self.video_delay = int(1000 / fps) if fps > 0 else 25
 
         self.is_playing = True
+        self.playing_file = video_file
         self.update_frame()
 
+    def _show_poster(self, poster_file):
+        """Shows a clip's poster right away, while its first frames are still decoding."""
+        import cv2
+
+        frame = cv2.imread(poster_file)
+        if frame is not None:
+            self.last_frame = frame
+            self._display_frame(frame, self.video_label, self.preview_label)
+
+    def _request_proxy(self, video_file):
+        """Queues a preview proxy for video_file on the background generator."""
+        if self.proxy_generator is None:
+            from proxy_cache import ProxyCache, ProxyGenerator
+
+            proxy_cache = ProxyCache(os.path.join(self.base_dir, video_ops.PROXY_CACHE_DIR))
+            # on_ready runs on the generator's thread, where Tk mustn't be touched (not
+            # even after()); the job scheduler hands the result to the Tk thread's poll.
+            self.proxy_generator = ProxyGenerator(
+                proxy_cache, on_ready=lambda *paths: self.jobs.call_soon(self._on_proxy_ready, *paths))
+        self.proxy_generator.request(video_file)
+
+    def _on_proxy_ready(self, video_file, proxy_path, poster_path):
+        """Remembers a finished proxy; the next preview of that clip will use it."""
+        self.proxy_paths[video_file] = (proxy_path, poster_path)
+
     def on_label_resize(self, event):
         """
         Resizes and displays the last known video frame whenever the label's
@@ -176,47 +259,73 @@ class VideoUtilityApp(tk.Tk):
         if self.last_frame is not None:
             self._display_frame(self.last_frame, event.widget)
             
-    def _display_frame(self, frame, label):
-        """Helper function to resize and display a frame on a given label."""
-        label_width = label.winfo_width()
-        label_height = label.winfo_height()
-
-        if label_width > 1 and label_height > 1:
-            h, w, _ = frame.shape
-            aspect_ratio = w / h
-            new_w = label_width
-            new_h = int(new_w / aspect_ratio)
-            
-            if new_h > label_height:
-                new_h = label_height
-                new_w = int(new_h * aspect_ratio)
-
-            resized_frame = cv2.resize(frame, (new_w, new_h))
-            rgb_frame = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB)
-            image = Image.fromarray(rgb_frame)
-            photo_image = ImageTk.PhotoImage(image)
-            
-            label.config(image=photo_image)
-            label.image = photo_image
+    def _display_frame(self, frame, *labels):
+        """
+        Helper function to resize and display a frame on the given labels.
+        The colour conversion and buffers are shared between the labels.
+        """
+        if self.renderer is None:
+            from render_pipeline import FrameRenderer
+            self.renderer = FrameRenderer()
+        self.renderer.render(frame, labels)
 
     def update_frame(self):
         """
-        Reads a new frame from the video, stores it, and displays it on
-        the video and preview labels.
+        Takes the frame that is due now from the playback engine, stores it,
+        and displays it on the video and preview labels. The next tick is
+        scheduled for when the following frame is due, so time spent
+        displaying doesn't make playback drift.
         """
-        if not self.is_playing or not self.cap or not self.cap.isOpened():
+        if not self.is_playing or not self.player:
             return
 
-        ret, frame = self.cap.read()
-        if ret:
+        frame = self.player.next_frame()
+        if frame is not None:
             self.last_frame = frame
-            self._display_frame(self.last_frame, self.video_label)
-            self._display_frame(self.last_frame, self.preview_label)
-            
-            self.after_id = self.after(self.video_delay, self.update_frame)
-        else:
+            self._display_frame(self.last_frame, self.video_label, self.preview_label)
+            self.playback_stats.set(f"{self.player.achieved_fps():.1f} fps | {self.player.frames_dropped} dropped")
+        elif self.player.is_finished():
             self.stop_video()
+            return
+
+        delay_ms = max(1, int(self.player.seconds_until_next() * 1000))
+        self.after_id = self.after(delay_ms, self.update_frame)
             
+    def _poll_jobs(self):
+        """Runs job callbacks on the Tk thread; worker threads never touch the UI."""
+        self.jobs.poll()
+        self.after(JOB_POLL_MS, self._poll_jobs)
+
+    def _start_job(self, name, func, *args, on_done=None, error_title="Error", unit="frames", show_progress=True,
+                   show_items=False):
+        """
+        Queues func(*args, progress_callback) on the job scheduler. A progress
+        window with a Cancel button is shown while it waits and runs.
+        on_done(result) runs on the Tk thread; errors are shown in a message box.
+        Returns the progress window (None if show_progress is False).
+        """
+        window = None
+
+        def finished(job):
+            if window is not None and window.winfo_exists():
+                window.destroy()
+            if job.state == "done":
+                if on_done:
+                    on_done(job.result)
+            elif job.state == "failed":
+                messagebox.showerror(error_title, str(job.error))
+
+        job = self.jobs.submit(name, func, *args, on_done=finished, on_error=finished,
+                               on_progress=lambda job: window.update_progress(job) if window else None)
+        if show_progress:
+            window = JobProgressWindow(self, job, unit, show_items)
+        return window
+
+    def _show_scene_item(self, window, index, start, end, status):
+        """Lists a scene in a job's progress window as soon as it is known."""
+        if window is not None:
+            window.set_item(index, f"Scene {index + 1}: {start.get_timecode()} - {end.get_timecode()}  {status}")
+
     def extract_frame(self):
         """Extracts the last frame of the selected video."""
         selected_indices = self.clip_listbox.curselection()
@@ -226,55 +335,35 @@ class VideoUtilityApp(tk.Tk):
 
         video_file = self.clip_list[selected_indices[0]]
         output_file = self.output_filename.get()
-
-        if not os.path.exists(video_file):
-            messagebox.showerror("Error", f"The file '{video_file}' was not found.")
-            return
-
         # Corrected: Use self.base_dir to create the folder in the script's directory
-        output_dir = os.path.join(self.base_dir, "last_frame")
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = os.path.join(self.base_dir, video_ops.LAST_FRAME_DIR)
 
-        video_capture = cv2.VideoCapture(video_file)
-        if not video_capture.isOpened():
-            messagebox.showerror("Error", "Could not open the video file.")
-            return
+        # Quick enough that a progress window would only flash up.
+        self._start_job("Extracting Last Frame",
+                        lambda progress_callback: video_ops.extract_last_frame(video_file, output_dir, output_file),
+                        on_done=lambda full_path: messagebox.showinfo("Success", f"The last frame has been saved as '{full_path}'."),
+                        show_progress=False)
 
-        total_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
-        if total_frames <= 0:
-            messagebox.showerror("Error", "Could not determine the number of frames.")
-            video_capture.release()
+    def extract_all_frames(self):
+        """Extracts the last frame of every clip in the list, several at a time."""
+        if not self.clip_list:
+            messagebox.showerror("Error", "Please add at least one clip to extract last frames from.")
             return
 
-        video_capture.set(cv2.CAP_PROP_POS_FRAMES, total_frames - 1)
-        success, last_frame = video_capture.read()
-
-        if success:
-            try:
-                base_name, extension = os.path.splitext(output_file)
-                base_name = re.sub(r'_\d+$', '', base_name)
-                
-                max_num = 0
-                for filename in os.listdir(output_dir):
-                    if filename.startswith(base_name) and filename.endswith(extension):
-                        try:
-                            num = int(re.search(r'_(\d+)', filename).group(1))
-                            max_num = max(max_num, num)
-                        except (AttributeError, ValueError):
-                            pass
-                
-                next_num = max_num + 1
-                new_filename = f"{base_name}_{next_num}{extension}"
-                full_path = os.path.join(output_dir, new_filename)
-                
-                cv2.imwrite(full_path, last_frame)
-                messagebox.showinfo("Success", f"The last frame has been saved as '{full_path}'.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save the image: {e}")
-        else:
-            messagebox.showerror("Error", "Could not read the last frame from the video.")
-
-        video_capture.release()
+        output_dir = os.path.join(self.base_dir, video_ops.LAST_FRAME_DIR)
+        output_file = self.output_filename.get()
+
+        def show_results(results):
+            failed = [f"{os.path.basename(clip)}: {result}" for clip, result in results if isinstance(result, Exception)]
+            saved = len(results) - len(failed)
+            if failed:
+                message = f"Saved {saved} of {len(results)} last frames to '{output_dir}'.\n\nFailed:\n" + "\n".join(failed)
+                messagebox.showwarning("Extract Last Frames", message)
+            else:
+                messagebox.showinfo("Success", f"Saved {saved} last frames to '{output_dir}'.")
+
+        self._start_job("Extracting Last Frames", video_ops.extract_last_frames, list(self.clip_list), output_dir, output_file, None,
+                        on_done=show_results, unit="clips")
 
     def reverse_clip(self):
         """Initiates the process of reversing the selected video clip."""
@@ -289,59 +378,11 @@ class VideoUtilityApp(tk.Tk):
             messagebox.showerror("Error", f"The file '{video_file}' was not found.")
             return
 
-        base_name, extension = os.path.splitext(os.path.basename(video_file))
         # Corrected: Use self.base_dir to create the folder in the script's directory
-        output_dir = os.path.join(self.base_dir, "reversed_clip")
-        os.makedirs(output_dir, exist_ok=True)
-
-        counter = 1
-        output_file_name = f"{base_name}_reversed{extension}"
-        output_path = os.path.join(output_dir, output_file_name)
-
-        while os.path.exists(output_path):
-            output_file_name = f"{base_name}_reversed_{counter}{extension}"
-            output_path = os.path.join(output_dir, output_file_name)
-            counter += 1
-
-        threading.Thread(target=self._run_reverse_clip, args=(video_file, output_path)).start()
-
-    def _run_reverse_clip(self, video_file, output_file_path):
-        """Internal function to handle the reversing process in a separate thread."""
-        try:
-            cap = cv2.VideoCapture(video_file)
-            if not cap.isOpened():
-                messagebox.showerror("Error", "Could not open the video file for reversing.")
-                return
-
-            frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-
-            frames = []
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                frames.append(frame)
-
-            cap.release()
-            frames.reverse()
-
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_file_path, fourcc, fps, (frame_width, frame_height))
-
-            if not out.isOpened():
-                messagebox.showerror("Error", "Could not create the output video file. Check codec compatibility.")
-                return
-
-            for frame in frames:
-                out.write(frame)
-
-            out.release()
-            messagebox.showinfo("Success", f"Clip successfully reversed and saved to '{output_file_path}'.")
-
-        except Exception as e:
-            messagebox.showerror("Reversing Error", f"An error occurred during reversing: {e}")
+        output_dir = os.path.join(self.base_dir, video_ops.REVERSED_DIR)
+        self._start_job("Reversing Clip", video_ops.reverse_clip, video_file, output_dir, self.options,
+                        on_done=lambda path: messagebox.showinfo("Success", f"Clip successfully reversed and saved to '{path}'."),
+                        error_title="Reversing Error")
 
     def ai_auto_clip(self):
         """
@@ -355,154 +396,87 @@ class VideoUtilityApp(tk.Tk):
 
         video_file = self.clip_list[selected_indices[0]]
 
-        # Run scene detection in a separate thread to avoid freezing the GUI
-        threading.Thread(target=self._run_scene_detection, args=(video_file,)).start()
+        # Unchanged file analysed before with the same settings: skip detection.
+        cached_scenes = self.scene_cache.get(video_file, self.options.scene_detection_params())
+        if cached_scenes:
+            self._show_scene_selection(video_file, cached_scenes)
+            return
 
-    def _run_scene_detection(self, video_file):
-        """Internal function to handle scene detection."""
-        try:
-            # Use the new open_video function, which is the modern replacement for the deprecated VideoManager.
-            video = open_video(video_file)
-            scene_manager = SceneManager()
-            scene_manager.add_detector(ContentDetector())
+        output_dir = os.path.join(self.base_dir, video_ops.COMPILED_DIR)
+        if self.options.auto_clip_mode == "single_pass":
+            # Detection and compilation share one decode of the file.
+            def show_result(result):
+                scene_list, output_path = result
+                if not scene_list:
+                    messagebox.showinfo("AI Auto Clip", "No significant scene changes were detected.")
+                else:
+                    messagebox.showinfo("Success", f"Selected scenes have been compiled into '{output_path}'.")
+
+            self._start_job("Compiling Clips", video_ops.detect_and_compile_scenes, video_file, output_dir,
+                            self.options, self.scene_cache, on_done=show_result, error_title="AI Auto Clip Error")
+            return
+
+        if self.options.auto_clip_mode == "incremental":
+            # Each scene is saved as soon as it is found, while the rest is still being analysed.
+            scenes = {}
+
+            def scene_found(index, start, end):
+                scenes[index] = (start, end)
+                # window is looked up on the Tk thread, where it is sure to be assigned.
+                self.jobs.call_soon(lambda: self._show_scene_item(window, index, start, end, "saving..."))
+
+            def scene_saved(index, clip_path):
+                start, end = scenes[index]
+                self.jobs.call_soon(lambda: self._show_scene_item(window, index, start, end, "saved"))
+
+            def show_clips(result):
+                scene_list, output_path, scenes_dir = result
+                if not scene_list:
+                    messagebox.showinfo("AI Auto Clip", "No significant scene changes were detected.")
+                else:
+                    messagebox.showinfo("Success", f"{len(scene_list)} scenes were saved to '{scenes_dir}' "
+                                                   f"and compiled into '{output_path}'.")
+
+            window = self._start_job("Saving Scenes", video_ops.auto_clip_incremental, video_file, output_dir,
+                                     self.options, self.scene_cache, scene_found, scene_saved,
+                                     on_done=show_clips, error_title="AI Auto Clip Error", show_items=True)
+            return
 
-            # The detect_scenes function now takes the video object directly.
-            scene_manager.detect_scenes(video=video)
-            scene_list = scene_manager.get_scene_list()
+        def scene_found(index, start, end):
+            self.jobs.call_soon(lambda: self._show_scene_item(window, index, start, end, ""))
 
+        def show_scenes(scene_list):
             if not scene_list:
-                self.after(0, lambda: messagebox.showinfo("AI Auto Clip", "No significant scene changes were detected."))
+                messagebox.showinfo("AI Auto Clip", "No significant scene changes were detected.")
                 return
+            self._show_scene_selection(video_file, scene_list)
 
-            # Present the detected scenes to the user in the main thread.
-            self.after(0, self._show_scene_selection, video_file, scene_list)
-
-        except Exception as e:
-            self.after(0, lambda e=e: messagebox.showerror("AI Auto Clip Error", f"An error occurred during scene detection: {e}"))
-
+        # Scene detection runs as a job so the GUI doesn't freeze; scenes are listed as they are found.
+        window = self._start_job("Detecting Scenes", video_ops.detect_scenes_live, video_file, self.options,
+                                 self.scene_cache, scene_found, on_done=show_scenes,
+                                 error_title="AI Auto Clip Error", show_items=True)
 
     def _show_scene_selection(self, video_file, scene_list):
         """
-        Creates a new window to display the list of scenes.
+        Takes the list of detected scenes.
         Automatically selects all clips and initiates the compilation.
         """
-        selection_window = tk.Toplevel(self)
-        selection_window.title("Compiling Clips...")
-        selection_window.geometry("500x150")
-        selection_window.configure(bg="#2c3e50")
-        
-        tk.Label(selection_window, text="Automatically compiling clips. Please wait...", bg="#2c3e50", fg="#ecf0f1", font=("Arial", 14, "bold")).pack(expand=True)
-
         selected_indices = list(range(len(scene_list)))
         # Corrected: Use self.base_dir to create the folder in the script's directory
-        output_dir = os.path.join(self.base_dir, "compiled_clips")
-        os.makedirs(output_dir, exist_ok=True)
-        threading.Thread(target=self._compile_selected_clips_thread, args=(video_file, scene_list, selected_indices, output_dir, selection_window)).start()
-
-    def _save_selected_clips_thread(self, video_file, scene_list, selected_indices, output_dir, window_to_close):
-        """Saves selected clips in a background thread using OpenCV."""
-        try:
-            for index in selected_indices:
-                start_timecode, end_timecode = scene_list[index]
-                start_frame = start_timecode.get_frames()
-                end_frame = end_timecode.get_frames()
-                
-                self._save_clip(video_file, start_frame, end_frame, output_dir, f"scene_{index + 1}")
-            
-            self.after(0, lambda: messagebox.showinfo("Success", f"Selected clips have been saved to the '{output_dir}' folder."))
-        except Exception as e:
-            self.after(0, lambda e=e: messagebox.showerror("Save Error", f"Failed to save clips: {e}"))
-        finally:
-            self.after(0, window_to_close.destroy)
-
-    def _save_clip(self, input_path, start_frame, end_frame, output_dir, clip_name):
-        """Saves a clip from the video using OpenCV."""
-        cap = cv2.VideoCapture(input_path)
-        if not cap.isOpened():
-            raise IOError(f"Could not open video file: {input_path}")
-
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
-        output_filename = f"{clip_name}.mp4"
-        output_path = os.path.join(output_dir, output_filename)
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v') # Codec for MP4
-        out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
-        
-        if not out.isOpened():
-            cap.release()
-            raise IOError(f"Could not create output video file: {output_path}")
-
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-        for _ in range(int(end_frame - start_frame)):
-            ret, frame = cap.read()
-            if not ret:
-                break
-            out.write(frame)
-        
-        cap.release()
-        out.release()
-        
-    def _compile_selected_clips_thread(self, video_file, scene_list, selected_indices, output_dir, window_to_close):
-        """
-        Compiles selected clips into a single video file in a background thread using OpenCV.
-        """
-        try:
-            # Check if video file exists
-            if not os.path.exists(video_file):
-                self.after(0, lambda: messagebox.showerror("Error", f"Video file not found: {video_file}"))
-                return
+        output_dir = os.path.join(self.base_dir, video_ops.COMPILED_DIR)
+        self._compile_selected_clips(video_file, scene_list, selected_indices, output_dir)
 
-            cap = cv2.VideoCapture(video_file)
-            if not cap.isOpened():
-                self.after(0, lambda: messagebox.showerror("Error", "Could not open the video file for compilation."))
-                return
+    def _save_selected_clips(self, video_file, scene_list, selected_indices, output_dir):
+        """Saves the selected scenes as separate clips, spread over a process pool."""
+        self._start_job("Saving Clips", video_ops.save_scenes, video_file, scene_list, selected_indices, output_dir, self.options,
+                        on_done=lambda folder: messagebox.showinfo("Success", f"Selected clips have been saved to the '{folder}' folder."),
+                        error_title="Save Error")
 
-            frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-
-            # Define the output file path with a counter to prevent overwriting
-            base_name = os.path.basename(os.path.splitext(video_file)[0])
-            counter = 1
-            output_filename = f"{base_name}_compiled.mp4"
-            output_path = os.path.join(output_dir, output_filename)
-            while os.path.exists(output_path):
-                output_filename = f"{base_name}_compiled_{counter}.mp4"
-                output_path = os.path.join(output_dir, output_filename)
-                counter += 1
-
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
-
-            if not out.isOpened():
-                cap.release()
-                self.after(0, lambda: messagebox.showerror("Error", "Could not create the output video file. Check codec compatibility."))
-                return
-            
-            # Iterate through the selected scene indices and write frames to the output file
-            for index in selected_indices:
-                start_frame = scene_list[index][0].get_frames()
-                end_frame = scene_list[index][1].get_frames()
-
-                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-                
-                for _ in range(int(end_frame - start_frame)):
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                    out.write(frame)
-            
-            # Release resources
-            cap.release()
-            out.release()
-                
-            self.after(0, lambda: messagebox.showinfo("Success", f"Selected scenes have been compiled into '{output_path}'."))
-        except Exception as e:
-            self.after(0, lambda e=e: messagebox.showerror("Compilation Error", f"An error occurred during compilation: {e}"))
-        finally:
-            self.after(0, window_to_close.destroy)
+    def _compile_selected_clips(self, video_file, scene_list, selected_indices, output_dir):
+        """Compiles the selected scenes into a single video file."""
+        self._start_job("Compiling Clips", video_ops.compile_scenes, video_file, scene_list, selected_indices, output_dir, self.options,
+                        on_done=lambda path: messagebox.showinfo("Success", f"Selected scenes have been compiled into '{path}'."),
+                        error_title="Compilation Error")
 
     def add_clip(self):
         """Adds a video clip to the list for merging."""
@@ -518,6 +492,7 @@ class VideoUtilityApp(tk.Tk):
             self.clip_listbox.selection_set(tk.END)
             self.clip_listbox.see(tk.END)
 
+            self._request_proxy(file_path)
             self.play_video(file_path)
 
     def remove_clip(self):
@@ -545,7 +520,9 @@ class VideoUtilityApp(tk.Tk):
             
             self.clip_listbox.selection_clear(0, tk.END)
             self.clip_listbox.selection_set(index - 1)
-            self.play_video(file_path)
+            # Reordering the clip that is already playing shouldn't restart it.
+            if file_path != self.playing_file:
+                self.play_video(file_path)
 
     def move_down(self):
         """Moves the selected clip down in the list."""
@@ -562,7 +539,9 @@ class VideoUtilityApp(tk.Tk):
 
             self.clip_listbox.selection_clear(0, tk.END)
             self.clip_listbox.selection_set(index + 1)
-            self.play_video(file_path)
+            # Reordering the clip that is already playing shouldn't restart it.
+            if file_path != self.playing_file:
+                self.play_video(file_path)
             
     def merge_clips(self):
         """Initiates the process of merging clips."""
@@ -571,72 +550,42 @@ class VideoUtilityApp(tk.Tk):
             return
 
         # Corrected: Use self.base_dir to create the folder in the script's directory
-        output_dir = os.path.join(self.base_dir, "merged_clips")
-        os.makedirs(output_dir, exist_ok=True)
-        base_name = "merged_video"
-        extension = ".mp4"
-        
-        counter = 1
-        output_file_name = f"{base_name}{extension}"
-        output_path = os.path.join(output_dir, output_file_name)
-        
-        while os.path.exists(output_path):
-            output_file_name = f"{base_name}_{counter}{extension}"
-            output_path = os.path.join(output_dir, output_file_name)
-            counter += 1
+        output_dir = os.path.join(self.base_dir, video_ops.MERGED_DIR)
+        self._start_job("Merging Clips", video_ops.merge_clips, list(self.clip_list), output_dir, self.options,
+                        on_done=lambda path: messagebox.showinfo("Success", f"Clips successfully merged into '{path}'."),
+                        error_title="Merging Error")
+
+    def on_close(self):
+        """Cancels queued and running jobs, closes pooled video files, then closes the window."""
+        self.jobs.shutdown()
+        self.stop_video()
+        # Only if something opened a video; importing it here would load OpenCV just to exit.
+        capture_pool = sys.modules.get("capture_pool")
+        if capture_pool:
+            capture_pool.shared_pool().clear()
+        self.destroy()
 
-        threading.Thread(target=self._run_merge_clips, args=(output_path,)).start()
+    def measure_startup(self):
+        """
+        Prints how long the imports took and how long it was until the window
+        was first painted, then closes the app. Used by --measure-startup.
+        """
+        created_time = time.perf_counter()
 
-    def _run_merge_clips(self, output_file_path):
-        """Internal function to handle the merging process."""
-        try:
-            caps = [cv2.VideoCapture(clip) for clip in self.clip_list]
-            if not all(cap.isOpened() for cap in caps):
-                messagebox.showerror("Error", "Failed to open one or more video files.")
-                for cap in caps:
-                    cap.release()
+        def on_first_paint(event):
+            if getattr(self, "_first_paint_seen", False):
                 return
+            self._first_paint_seen = True
+            painted_time = time.perf_counter()
+            print(f"imports_ms={(IMPORTS_DONE_TIME - STARTUP_TIME) * 1000:.1f}")
+            print(f"window_created_ms={(created_time - STARTUP_TIME) * 1000:.1f}")
+            print(f"first_paint_ms={(painted_time - STARTUP_TIME) * 1000:.1f}", flush=True)
+            self.after(0, self.destroy)
 
-            frame_width = int(caps[0].get(cv2.CAP_PROP_FRAME_WIDTH))
-            frame_height = int(caps[0].get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = caps[0].get(cv2.CAP_PROP_FPS)
-
-            for cap in caps[1:]:
-                if int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) != frame_width or \
-                   int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) != frame_height:
-                    messagebox.showerror("Error", "All videos must have the same dimensions to be merged.")
-                    for c in caps: c.release()
-                    return
-
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_file_path, fourcc, fps, (frame_width, frame_height))
+        self.bind("<Expose>", on_first_paint, add="+")
 
-            if not out.isOpened():
-                messagebox.showerror("Error", "Could not create the output video file. Check codec compatibility.")
-                for c in caps: c.release()
-                return
-            
-            for cap in caps:
-                while True:
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                    out.write(frame)
-                cap.release()
-
-            out.release()
-            messagebox.showinfo("Success", f"Clips successfully merged into '{output_file_path}'.")
-
-        except Exception as e:
-            messagebox.showerror("Merging Error", f"An error occurred during merging: {e}")
-        finally:
-            if 'caps' in locals():
-                for cap in caps:
-                    if cap and cap.isOpened():
-                        cap.release()
-            if 'out' in locals():
-                out.release()
-                
 if __name__ == "__main__":
     app = VideoUtilityApp()
+    if "--measure-startup" in sys.argv:
+        app.measure_startup()
     app.mainloop()
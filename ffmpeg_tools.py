@@ -0,0 +1,119 @@
+"""
+Helpers for the optional ffmpeg/ffprobe command line tools.
+
+OpenCV can only decode and re-encode, so anything that works at the packet
+level (stream copy, concatenation without re-encoding) goes through ffmpeg.
+Everything here checks for the tools first; callers fall back to the OpenCV
+path when ffmpeg isn't installed.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+
+def find_ffmpeg():
+    """Returns the path to ffmpeg, or None if it isn't on the PATH."""
+    return shutil.which("ffmpeg")
+
+
+def find_ffprobe():
+    """Returns the path to ffprobe, or None if it isn't on the PATH."""
+    return shutil.which("ffprobe")
+
+
+def run_ffmpeg(args):
+    """Runs ffmpeg with the given arguments and raises RuntimeError on failure."""
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg was not found on the PATH.")
+    result = subprocess.run([ffmpeg, "-hide_banner", "-loglevel", "error", "-y"] + list(args),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()}")
+
+
+def probe_streams(video_file):
+    """Returns the list of stream dicts reported by ffprobe for a file."""
+    ffprobe = find_ffprobe()
+    if not ffprobe:
+        raise RuntimeError("ffprobe was not found on the PATH.")
+    result = subprocess.run([ffprobe, "-v", "error", "-show_streams", "-of", "json", video_file],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on '{video_file}': {result.stderr.strip()}")
+    return json.loads(result.stdout or "{}").get("streams", [])
+
+
+def probe_video_packets(video_file):
+    """
+    Lists the first video stream's packets as (pts_seconds, is_keyframe) in
+    file order. ffprobe only reads the packet headers, nothing is decoded.
+    Packets without a timestamp are left out.
+    """
+    ffprobe = find_ffprobe()
+    if not ffprobe:
+        raise RuntimeError("ffprobe was not found on the PATH.")
+    result = subprocess.run([ffprobe, "-v", "error", "-select_streams", "v:0",
+                             "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", video_file],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on '{video_file}': {result.stderr.strip()}")
+
+    packets = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        try:
+            packets.append((float(pts_time), "K" in flags))
+        except ValueError:
+            continue
+    return packets
+
+
+def stream_signature(video_file):
+    """
+    Summarises the properties that have to match for two files to be joined
+    without re-encoding: codec, profile, resolution, pixel format, frame rate
+    and timebase for video, and codec/sample rate/channels for audio.
+    """
+    signature = []
+    for stream in probe_streams(video_file):
+        kind = stream.get("codec_type")
+        if kind == "video":
+            signature.append((kind, stream.get("codec_name"), stream.get("profile"),
+                              stream.get("width"), stream.get("height"), stream.get("pix_fmt"),
+                              stream.get("r_frame_rate"), stream.get("time_base")))
+        elif kind == "audio":
+            signature.append((kind, stream.get("codec_name"), stream.get("sample_rate"),
+                              stream.get("channels")))
+    return tuple(signature)
+
+
+def can_stream_copy(video_files):
+    """True if ffmpeg is available and every file has the same stream layout."""
+    if not video_files or not find_ffmpeg() or not find_ffprobe():
+        return False
+    try:
+        signatures = {stream_signature(path) for path in video_files}
+    except (RuntimeError, ValueError):
+        return False
+    return len(signatures) == 1 and any(s[0] == "video" for s in next(iter(signatures)))
+
+
+def concat_copy(video_files, output_path):
+    """
+    Joins the files at the packet level with ffmpeg's concat demuxer. Nothing
+    is decoded or re-encoded, so this runs at disk speed and is lossless.
+    """
+    fd, list_path = tempfile.mkstemp(prefix="concat_", suffix=".txt")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as list_file:
+            for path in video_files:
+                # The concat demuxer wants single quotes escaped as '\''
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                list_file.write(f"file '{escaped}'\n")
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path,
+                    "-map", "0", "-c", "copy", "-movflags", "+faststart", output_path])
+    finally:
+        os.remove(list_path)
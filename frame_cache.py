@@ -0,0 +1,115 @@
+"""
+On-disk cache of decoded frames, read back through memory maps.
+
+Reversing, saving scenes from and compiling the same clip one after
+another used to decode it from scratch every time (reverse even decodes
+parts of it twice, once per seek). With the cache on, the first of those
+operations decodes the clip once, front to back, into a raw file of BGR
+frames; every later one maps that file and reads the frames as NumPy
+views, so it is bounded by disk reads instead of decoding and never has
+to seek.
+
+Each clip is one file: a small header with the frame count and shape,
+then the frames back to back. Files are keyed by the same fingerprint as
+the scene cache, written under a temporary name and renamed into place,
+and the folder is kept under max_bytes by evicting the least recently
+used clips. A clip that wouldn't fit on its own is never cached.
+"""
+import os
+import struct
+import threading
+
+import numpy as np
+
+from capture_pool import shared_pool
+from frame_pipeline import timed_read
+from metrics import shared_metrics
+from scene_cache import evict_lru, file_fingerprint
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frame_cache")
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024 # 4 GB of decoded frames
+MAGIC = b"VFC1"
+HEADER = struct.Struct("<4sIIII") # magic, frame count, height, width, channels
+HEADER_BYTES = 4096 # Frames start on a page boundary
+
+
+class FrameCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, video_file):
+        return os.path.join(self.cache_dir, f"{file_fingerprint(video_file)}.raw")
+
+    def get(self, video_file):
+        """
+        Returns the cached frames as a read-only (count, height, width, 3)
+        memory-mapped array, or None on a miss.
+        """
+        try:
+            entry_path = self._entry_path(video_file)
+            with open(entry_path, "rb") as f:
+                magic, count, height, width, channels = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or count == 0:
+                shared_metrics().count("frame_cache_misses")
+                return None
+            frames = np.memmap(entry_path, dtype=np.uint8, mode="r", offset=HEADER_BYTES,
+                               shape=(count, height, width, channels))
+        except (OSError, ValueError, struct.error):
+            shared_metrics().count("frame_cache_misses")
+            return None
+        shared_metrics().count("frame_cache_hits")
+
+        # Touch the entry so eviction treats it as recently used.
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return frames
+
+    def load(self, video_file, progress_callback=None):
+        """
+        Returns the cached frames for video_file, decoding the clip into the
+        cache on a miss. Returns None if the clip doesn't fit in max_bytes.
+        progress_callback(frames_decoded, frame_count) is called while decoding.
+        """
+        frames = self.get(video_file)
+        if frames is not None:
+            return frames
+
+        pool = shared_pool()
+        info = pool.info(video_file)
+        frame_bytes = info.width * info.height * 3
+        if frame_bytes == 0 or info.frame_count * frame_bytes > self.max_bytes:
+            return None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = self._entry_path(video_file)
+        # Unique temp name: two jobs (or worker processes) may cache the same clip at once.
+        temp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        count = 0
+        try:
+            with open(temp_path, "wb") as f, pool.capture(video_file) as cap:
+                f.write(b"\0" * HEADER_BYTES)
+                while True:
+                    ret, frame = timed_read(cap)
+                    if not ret:
+                        break
+                    if frame.shape != (info.height, info.width, 3) or (count + 1) * frame_bytes > self.max_bytes:
+                        # The frame count was an underestimate (or the size changed): don't cache it.
+                        return None
+                    frame.tofile(f)
+                    count += 1
+                    if progress_callback and count % 50 == 0:
+                        progress_callback(count, info.frame_count)
+                if count == 0:
+                    return None
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, count, info.height, info.width, 3))
+            os.replace(temp_path, entry_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        evict_lru(self.cache_dir, self.max_bytes, (".raw",))
+        return self.get(video_file)
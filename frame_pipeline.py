@@ -0,0 +1,225 @@
+"""
+Decode -> transform -> encode pipeline linked by bounded queues.
+
+Every output operation used to alternate cap.read() and out.write() on
+one thread, so decoding and encoding never overlapped. A FramePipeline
+runs the decoder on its own thread, an optional transform stage (e.g.
+merge's normalizer) on another, and the encoder on the calling thread,
+so progress reports and cancellation (JobCancelled raised from a
+progress callback) still happen where they always did. OpenCV releases
+the GIL while it decodes, scales and encodes, so the stages really do run
+at the same time.
+
+Frames travel in buffers that are allocated once per pipeline: `depth`
+buffers for decoded frames (and as many for transformed ones) go back
+and forth between the stages. When the encoder falls behind, the decoder
+waits for a free buffer, so memory stays at a few frames per stage
+however long the output is.
+
+Decode, transform and encode times, frames decoded and encoded, how full
+the queue into the encoder is and how often the decoder had to wait for
+a free buffer all go to the shared metrics (metrics.py).
+"""
+import queue
+import threading
+
+import numpy as np
+
+from metrics import shared_metrics
+
+DEFAULT_DEPTH = 8 # Buffers per stage
+REPORT_EVERY = 50 # Frames between progress reports
+
+_DONE = object() # Put on a queue after the last frame
+
+
+def timed_read(cap, buffer=None):
+    """cap.read(buffer), recorded in the shared metrics as a decode."""
+    metrics = shared_metrics()
+    with metrics.timer("decode"):
+        ret, frame = cap.read(buffer)
+    if ret:
+        metrics.count("frames_decoded")
+    return ret, frame
+
+
+class PipelineStopped(Exception):
+    """Raised inside the decode function when the pipeline is shutting down early."""
+
+
+class _Buffers:
+    """A stage's preallocated frame buffers: the free ones and the filled ones waiting for the next stage."""
+
+    def __init__(self, shape, depth, zeroed=False):
+        self.free = queue.Queue()
+        self.filled = queue.Queue()
+        for _ in range(depth):
+            self.free.put(np.zeros(shape, dtype=np.uint8) if zeroed else np.empty(shape, dtype=np.uint8))
+
+
+class FramePipeline:
+    def __init__(self, frame_shape, depth=DEFAULT_DEPTH, transform=None, output_shape=None):
+        """
+        frame_shape is the (height, width, 3) of decoded frames. transform(frame,
+        dst), if given, fills dst (an output_shape buffer, black to start with)
+        from each decoded frame on the transform thread.
+        """
+        self.transform = transform
+        self._decoded = _Buffers(frame_shape, depth)
+        self._output = _Buffers(output_shape or frame_shape, depth, zeroed=True) if transform else self._decoded
+        self._stop = threading.Event()
+
+    # Decoder side: called from decode(pipeline) on the decoder thread.
+
+    def buffer(self):
+        """A free buffer to decode into. Blocks while every buffer is in use further down the pipeline."""
+        return self._take(self._decoded.free)
+
+    def send(self, buffer):
+        """Passes a buffer from buffer() on to the next stage."""
+        self._decoded.filled.put(buffer)
+
+    def send_copy(self, frame):
+        """Copies frame (e.g. a view into a chunk buffer or the frame cache) into a buffer and sends it."""
+        buffer = self.buffer()
+        np.copyto(buffer, frame)
+        self.send(buffer)
+
+    def read(self, cap):
+        """Decodes cap's next frame straight into a buffer and sends it. Returns False at the end of the stream."""
+        buffer = self.buffer()
+        ret, frame = timed_read(cap, buffer)
+        if not ret:
+            self._decoded.free.put(buffer)
+            return False
+        if frame is not buffer:
+            # OpenCV didn't decode in place.
+            np.copyto(buffer, frame)
+        self.send(buffer)
+        return True
+
+    def _take(self, free):
+        try:
+            return free.get_nowait()
+        except queue.Empty:
+            # Every buffer is further down the pipeline: this stage is waiting on a slower one.
+            shared_metrics().count("pipeline_stalls")
+        while True:
+            if self._stop.is_set():
+                raise PipelineStopped()
+            try:
+                return free.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    # The stages
+
+    def _run_decoder(self, decode):
+        try:
+            decode(self)
+            self._decoded.filled.put(_DONE)
+        except PipelineStopped:
+            self._decoded.filled.put(_DONE)
+        except BaseException as e:
+            self._decoded.filled.put(e)
+
+    def _run_transform(self):
+        while True:
+            item = self._decoded.filled.get()
+            if item is _DONE or isinstance(item, BaseException):
+                self._output.filled.put(item)
+                return
+            try:
+                dst = self._take(self._output.free)
+                with shared_metrics().timer("transform"):
+                    self.transform(item, dst)
+            except PipelineStopped:
+                self._output.filled.put(_DONE)
+                return
+            except BaseException as e:
+                self._stop.set()
+                self._output.filled.put(e)
+                return
+            finally:
+                self._decoded.free.put(item)
+            self._output.filled.put(dst)
+
+    def run(self, decode, encode):
+        """
+        Runs decode(pipeline) on a decoder thread and calls encode(frame) on
+        this thread for every frame it sends, in order. Returns the number
+        of frames encoded. An error in any stage is re-raised here; if
+        encode raises, the other stages are stopped before it propagates.
+        """
+        threads = [threading.Thread(target=self._run_decoder, args=(decode,), daemon=True)]
+        if self.transform:
+            threads.append(threading.Thread(target=self._run_transform, daemon=True))
+        for thread in threads:
+            thread.start()
+
+        count = 0
+        metrics = shared_metrics()
+        try:
+            while True:
+                metrics.gauge("pipeline_queue_depth", self._output.filled.qsize())
+                item = self._output.filled.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                try:
+                    encode(item)
+                finally:
+                    self._output.free.put(item)
+                count += 1
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+        return count
+
+
+def decode_frames(cap, count=None):
+    """A decode function that sends the next count frames of cap (all of them if None)."""
+    def decode(pipeline):
+        sent = 0
+        while count is None or sent < count:
+            if not pipeline.read(cap):
+                break
+            sent += 1
+    return decode
+
+
+def copy_frames(frames):
+    """A decode function that sends frames that are already decoded (e.g. views into the frame cache)."""
+    def decode(pipeline):
+        for frame in frames:
+            pipeline.send_copy(frame)
+    return decode
+
+
+def write_frames(out, decode, frame_shape, report=None, transform=None, output_shape=None, depth=DEFAULT_DEPTH):
+    """
+    Runs decode(pipeline) through a FramePipeline and writes every frame
+    that comes out to out (a cv2.VideoWriter) on this thread. report(count)
+    is called here every REPORT_EVERY frames and for the rest at the end.
+    Returns the number of frames written.
+    """
+    written = [0]
+    metrics = shared_metrics()
+
+    def encode(frame):
+        with metrics.timer("encode"):
+            out.write(frame)
+        metrics.count("frames_encoded")
+        written[0] += 1
+        if report and written[0] % REPORT_EVERY == 0:
+            report(REPORT_EVERY)
+
+    pipeline = FramePipeline(frame_shape, depth, transform, output_shape)
+    pipeline.run(decode, encode)
+    if report and written[0] % REPORT_EVERY:
+        report(written[0] % REPORT_EVERY)
+    return written[0]
@@ -0,0 +1,154 @@
+"""
+Central job scheduler for long-running operations.
+
+Every button used to start its own thread, so a few clicks could have
+several CPU-heavy encodes fighting over the machine, and worker threads
+showed message boxes themselves. Jobs now go through one JobScheduler:
+
+- at most max_workers jobs run at once, the rest wait in order;
+- each job gets a progress_callback(done, total) that records frames
+  processed and works out a rate and an ETA;
+- job.cancel() asks a job to stop: the next progress report raises
+  JobCancelled inside the job, which unwinds it like any other error;
+- completion, error and progress callbacks are not called on the worker
+  thread. They are queued and run by poll(), which the UI calls from its
+  own thread (the CLI can simply call it in a loop).
+"""
+import concurrent.futures
+import itertools
+import queue
+import threading
+import time
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled."""
+
+
+class Job:
+    def __init__(self, job_id, name):
+        self.id = job_id
+        self.name = name
+        self.state = "queued" # queued, running, done, failed or cancelled
+        self.done = 0 # Frames (or other units) processed so far
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._progress_queued = False # An on_progress call is already waiting for poll()
+
+    def cancel(self):
+        """Asks the job to stop at its next progress report. A queued job never starts."""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled(f"{self.name} was cancelled.")
+
+    def rate(self):
+        """Units processed per second since the job started."""
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self):
+        """Estimated seconds left, or None while there is nothing to go on."""
+        rate = self.rate()
+        if rate <= 0 or self.total <= 0:
+            return None
+        return max(0.0, (self.total - self.done) / rate)
+
+
+class JobScheduler:
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix="job")
+        self._events = queue.Queue() # (callback, args) waiting for poll()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._jobs = []
+
+    def submit(self, name, func, *args, on_done=None, on_error=None, on_progress=None):
+        """
+        Queues func(*args, progress_callback). When it finishes, on_done(job)
+        or on_error(job) is called from poll(); on_progress(job) is called
+        from poll() as progress comes in. Returns the Job.
+        """
+        job = Job(next(self._ids), name)
+        with self._lock:
+            self._jobs.append(job)
+
+        def deliver_progress():
+            job._progress_queued = False
+            on_progress(job)
+
+        def queue_progress():
+            # Reports that arrive faster than poll() runs are folded into one update.
+            if on_progress and not job._progress_queued:
+                job._progress_queued = True
+                self._events.put((deliver_progress, ()))
+
+        def progress_callback(done, total):
+            job.check_cancelled()
+            job.done, job.total = done, total
+            queue_progress()
+
+        def run():
+            if job.cancelled:
+                job.state = "cancelled"
+            else:
+                job.state = "running"
+                job.started_at = time.monotonic()
+                queue_progress()
+                try:
+                    job.result = func(*args, progress_callback)
+                    job.state = "done"
+                except JobCancelled as e:
+                    job.state, job.error = "cancelled", e
+                except Exception as e:
+                    job.state, job.error = "failed", e
+                job.finished_at = time.monotonic()
+
+            callback = on_done if job.state == "done" else on_error
+            if callback:
+                self._events.put((callback, (job,)))
+            with self._lock:
+                self._jobs.remove(job)
+
+        self._executor.submit(run)
+        return job
+
+    def call_soon(self, callback, *args):
+        """Queues callback(*args) for the next poll(). Safe to call from any thread."""
+        self._events.put((callback, args))
+
+    def poll(self):
+        """Runs the callbacks that are waiting. Call this from the UI thread."""
+        while True:
+            try:
+                callback, args = self._events.get_nowait()
+            except queue.Empty:
+                return
+            callback(*args)
+
+    def active_jobs(self):
+        """Jobs that are queued or running."""
+        with self._lock:
+            return list(self._jobs)
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+
+    def shutdown(self, wait=False):
+        """Cancels everything and stops the worker threads."""
+        self.cancel_all()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,160 @@
+"""
+Per-file keyframe index for fast, frame-accurate seeking.
+
+cap.set(CAP_PROP_POS_FRAMES, n) makes OpenCV seek to some timestamp near
+frame n and then guess where it landed, which on long-GOP H.264 is slow
+and can be a few frames off. With the index we know which frames are
+keyframes, so a seek goes straight to the keyframe at or before the
+target (where OpenCV lands exactly) and the remaining frames are grabbed
+forward and counted by us. Targets inside the GOP we are already
+decoding don't seek at all.
+
+The index comes from one ffprobe pass over the packet headers (nothing
+is decoded) and is stored as JSON, keyed by the file fingerprint, so it
+is built once per file. Without ffprobe there is no index and seeks fall
+back to OpenCV's own.
+"""
+import bisect
+import json
+import os
+import time
+
+import cv2
+
+from ffmpeg_tools import find_ffprobe, probe_video_packets
+from metrics import shared_metrics
+from scene_cache import evict_lru, file_fingerprint
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "keyframe_cache")
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024 # 50 MB of keyframe indexes
+# Without an index, targets up to this many frames ahead are decoded forward instead of seeked to.
+FORWARD_DECODE_LIMIT = 30
+
+
+class KeyframeIndex:
+    def __init__(self, keyframes, keyframe_times, frame_count):
+        self.keyframes = keyframes # Sorted frame numbers (presentation order) of the keyframes
+        self.keyframe_times = keyframe_times # Their timestamps in seconds
+        self.frame_count = frame_count # Exact, counted from the packets
+
+    def keyframe_before(self, frame_num):
+        """The last keyframe at or before frame_num (0 if there is none)."""
+        i = bisect.bisect_right(self.keyframes, frame_num)
+        return self.keyframes[i - 1] if i else 0
+
+    def keyframe_after(self, frame_num):
+        """The first keyframe at or after frame_num, or None if there is none."""
+        i = bisect.bisect_left(self.keyframes, frame_num)
+        return self.keyframes[i] if i < len(self.keyframes) else None
+
+    def time_of(self, keyframe):
+        """Timestamp in seconds of a frame that is in self.keyframes."""
+        return self.keyframe_times[bisect.bisect_left(self.keyframes, keyframe)]
+
+    @classmethod
+    def from_packets(cls, packets):
+        """Builds the index from probe_video_packets() output."""
+        # Packets come in decode order; frame numbers count in presentation order.
+        ordered = sorted(packets, key=lambda packet: packet[0])
+        keyframes = [i for i, (_, is_key) in enumerate(ordered) if is_key]
+        keyframe_times = [pts for pts, is_key in ordered if is_key]
+        return cls(keyframes, keyframe_times, len(ordered))
+
+
+class KeyframeCache:
+    """Stores keyframe indexes as small JSON files in cache_dir."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, video_file):
+        return os.path.join(self.cache_dir, f"{file_fingerprint(video_file)}.json")
+
+    def get(self, video_file):
+        """Returns the stored KeyframeIndex, or None on a miss."""
+        try:
+            entry_path = self._entry_path(video_file)
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            index = KeyframeIndex(entry["keyframes"], entry["keyframe_times"], entry["frame_count"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # Touch the entry so eviction treats it as recently used.
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return index
+
+    def put(self, video_file, index):
+        """Stores an index and trims the cache back under max_bytes."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            "video_file": os.path.abspath(video_file),
+            "keyframes": index.keyframes,
+            "keyframe_times": index.keyframe_times,
+            "frame_count": index.frame_count,
+        }
+        entry_path = self._entry_path(video_file)
+        # Unique temp name: worker processes may store the same file's index at once.
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, entry_path)
+        evict_lru(self.cache_dir, self.max_bytes, (".json",))
+
+    def load(self, video_file):
+        """
+        Returns the index for video_file, building and storing it on a miss.
+        Returns None if no index can be built (no ffprobe, or no keyframes found).
+        """
+        index = self.get(video_file)
+        if index is not None:
+            return index
+        if not find_ffprobe():
+            return None
+        try:
+            index = KeyframeIndex.from_packets(probe_video_packets(video_file))
+        except RuntimeError:
+            return None
+        if not index.keyframes:
+            return None
+        try:
+            self.put(video_file, index)
+        except OSError:
+            pass # Still usable for this run.
+        return index
+
+
+def seek_frame(cap, target, position=-1, index=None):
+    """
+    Moves cap so that the next read() returns frame `target`. `position` is
+    the frame the next read() would return now (-1 if unknown). Returns the
+    new position, which is short of target only if the stream ended first.
+    """
+    metrics = shared_metrics()
+    start = time.perf_counter()
+    if index is not None:
+        keyframe = index.keyframe_before(target)
+        # Inside the GOP we're already decoding: just keep going.
+        if not keyframe <= position <= target:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            metrics.count("seeks")
+            position = keyframe
+    elif not 0 <= target - position <= FORWARD_DECODE_LIMIT or position < 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        metrics.count("seeks")
+        metrics.observe("seek", time.perf_counter() - start)
+        return target
+
+    grabbed = 0
+    while position < target:
+        if not cap.grab():
+            break
+        position += 1
+        grabbed += 1
+    metrics.count("seek_frames_grabbed", grabbed)
+    metrics.observe("seek", time.perf_counter() - start)
+    return position
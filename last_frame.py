@@ -0,0 +1,99 @@
+"""
+Last-frame extraction that doesn't trust CAP_PROP_FRAME_COUNT.
+
+Seeking to frame "count - 1" fails or falls back to a slow linear decode
+on variable-frame-rate files and many MKV/MOV files, where the count is
+only an estimate. Instead we seek by timestamp to a point shortly before
+the end - the demuxer lands on the keyframe before it - and decode
+forward until the stream runs out, keeping the last frame that decoded.
+The work is bounded by the GOP length plus the tail window, not by the
+length of the file.
+
+If OpenCV has no usable duration, ffmpeg (when it is on the PATH) seeks
+relative to the end of the file instead, and only if that fails too is
+the whole file decoded.
+"""
+import os
+import tempfile
+
+import cv2
+
+from capture_pool import shared_pool
+from ffmpeg_tools import find_ffmpeg, run_ffmpeg
+
+DEFAULT_TAIL_SECONDS = 2.0
+
+
+def _read_to_end(cap):
+    """Decodes until the stream ends. Returns the last frame, or None."""
+    last = None
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            return last
+        last = frame
+
+
+def _last_frame_ffmpeg(video_file, tail_seconds):
+    """
+    Lets ffmpeg seek relative to the end of the file (-sseof) and overwrite
+    one image with every decoded frame, so the last frame is what's left.
+    The image is a BMP: every frame of the tail gets written, and PNG
+    compression made that several times slower than decoding with OpenCV.
+    """
+    fd, image_path = tempfile.mkstemp(suffix=".bmp", prefix="last_frame_")
+    os.close(fd)
+    try:
+        run_ffmpeg(["-sseof", f"-{tail_seconds}", "-i", video_file, "-an", "-update", "1", image_path])
+        return cv2.imread(image_path)
+    except RuntimeError:
+        return None
+    finally:
+        os.remove(image_path)
+
+
+def _last_frame_opencv(video_file, tail_seconds):
+    """Seeks by timestamp near the estimated end and decodes forward. None if there is no usable duration."""
+    pool = shared_pool()
+    try:
+        info = pool.info(video_file)
+    except IOError:
+        raise IOError("Could not open the video file.")
+
+    fps, frame_count = info.fps, info.frame_count
+    if fps > 0 and frame_count > 0:
+        with pool.capture(video_file) as cap:
+            duration_ms = frame_count / fps * 1000
+            window_ms = tail_seconds * 1000
+            while True:
+                # If the estimate put us past the real end, widen the window.
+                cap.set(cv2.CAP_PROP_POS_MSEC, max(0.0, duration_ms - window_ms))
+                frame = _read_to_end(cap)
+                if frame is not None:
+                    return frame
+                if duration_ms - window_ms <= 0:
+                    break
+                window_ms *= 4
+    return None
+
+
+def _last_frame_full_decode(video_file):
+    # On a fresh capture, in case seeking left the pooled one in a bad state.
+    cap = cv2.VideoCapture(video_file)
+    try:
+        return _read_to_end(cap)
+    finally:
+        cap.release()
+
+
+def read_last_frame(video_file, tail_seconds=DEFAULT_TAIL_SECONDS):
+    """Returns the last decodable frame of video_file as a BGR array."""
+    frame = _last_frame_opencv(video_file, tail_seconds)
+    if frame is None and find_ffmpeg():
+        frame = _last_frame_ffmpeg(video_file, tail_seconds)
+    if frame is None:
+        # No usable duration either way: decode the whole file as a last resort.
+        frame = _last_frame_full_decode(video_file)
+    if frame is None:
+        raise IOError("Could not read the last frame from the video.")
+    return frame
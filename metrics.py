@@ -0,0 +1,169 @@
+"""
+Low-overhead counters, timers and gauges for the hot paths.
+
+The decode, detect, transform and encode loops record into one shared
+Metrics registry per process:
+
+- counters: how often something happened (frames decoded, seeks, capture
+  pool hits, ...);
+- timers: how long each call took, as a count, total, min, max and a
+  histogram with power-of-two millisecond buckets, from which p50/p95
+  are estimated;
+- gauges: the last and highest value seen (e.g. frame pipeline queue depth).
+
+Recording is a perf_counter() call and a dict update under a lock, well
+under a microsecond next to the milliseconds a frame takes to decode or
+encode. Worker processes record into their own registry; run_in_pool
+sends each job's snapshot back and merges it here, so the numbers cover
+the whole operation.
+
+snapshot() returns plain dicts that are JSON-ready; dump() writes them to
+a file. The app shows them live in its stats window (stats_view.py), and
+cli.py --metrics-out writes them when the jobs are done.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Upper bounds of the timer histogram buckets in milliseconds; the last bucket takes the rest.
+BUCKET_BOUNDS_MS = [0.25 * 2 ** i for i in range(16)] # 0.25 ms .. ~8 s
+
+
+def _new_timer():
+    return {"count": 0, "total": 0.0, "min": None, "max": 0.0, "buckets": [0] * (len(BUCKET_BOUNDS_MS) + 1)}
+
+
+def _bucket(milliseconds):
+    for i, bound in enumerate(BUCKET_BOUNDS_MS):
+        if milliseconds <= bound:
+            return i
+    return len(BUCKET_BOUNDS_MS)
+
+
+def _percentile(timer, fraction):
+    """
+    Upper bound (ms) of the bucket holding the given fraction of the
+    observations, capped at the slowest one seen, so a percentile in the
+    open-ended last bucket is the maximum rather than unknown.
+    """
+    if not timer["count"]:
+        return None
+    target = fraction * timer["count"]
+    seen = 0
+    for bound, bucket_count in zip(BUCKET_BOUNDS_MS, timer["buckets"]):
+        seen += bucket_count
+        if seen >= target:
+            return min(bound, timer["max"])
+    return timer["max"]
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timers = {}
+        self._gauges = {} # name -> [last, max]
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        """Records one timed call of `seconds`."""
+        milliseconds = seconds * 1000
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = _new_timer()
+            timer["count"] += 1
+            timer["total"] += milliseconds
+            timer["min"] = milliseconds if timer["min"] is None else min(timer["min"], milliseconds)
+            timer["max"] = max(timer["max"], milliseconds)
+            timer["buckets"][_bucket(milliseconds)] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """Times the with block, e.g. `with metrics.timer("encode"): out.write(frame)`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def gauge(self, name, value):
+        with self._lock:
+            gauge = self._gauges.get(name)
+            if gauge is None:
+                self._gauges[name] = [value, value]
+            else:
+                gauge[0] = value
+                gauge[1] = max(gauge[1], value)
+
+    def snapshot(self):
+        """Everything recorded so far, as JSON-ready dicts."""
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {name: dict(timer, buckets=list(timer["buckets"])) for name, timer in self._timers.items()}
+            gauges = {name: {"last": last, "max": peak} for name, (last, peak) in self._gauges.items()}
+        for timer in timers.values():
+            timer["mean"] = timer["total"] / timer["count"] if timer["count"] else None
+            timer["p50"] = _percentile(timer, 0.5)
+            timer["p95"] = _percentile(timer, 0.95)
+        return {
+            "started_at": self.started_at,
+            "taken_at": time.time(),
+            "bucket_bounds_ms": BUCKET_BOUNDS_MS,
+            "counters": counters,
+            "timers": timers,
+            "gauges": gauges,
+        }
+
+    def merge(self, snapshot):
+        """Adds another registry's snapshot (e.g. from a worker process) to this one."""
+        if not snapshot:
+            return
+        with self._lock:
+            for name, amount in snapshot["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + amount
+            for name, other in snapshot["timers"].items():
+                timer = self._timers.get(name)
+                if timer is None:
+                    timer = self._timers[name] = _new_timer()
+                timer["count"] += other["count"]
+                timer["total"] += other["total"]
+                if other["min"] is not None:
+                    timer["min"] = other["min"] if timer["min"] is None else min(timer["min"], other["min"])
+                timer["max"] = max(timer["max"], other["max"])
+                timer["buckets"] = [a + b for a, b in zip(timer["buckets"], other["buckets"])]
+            for name, other in snapshot["gauges"].items():
+                gauge = self._gauges.get(name)
+                if gauge is None:
+                    self._gauges[name] = [other["last"], other["max"]]
+                else:
+                    gauge[0] = other["last"]
+                    gauge[1] = max(gauge[1], other["max"])
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+            self._gauges.clear()
+        self.started_at = time.time()
+
+    def dump(self, path):
+        """Writes snapshot() to path as JSON."""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp_path, path)
+
+
+_shared_metrics = Metrics()
+
+
+def shared_metrics():
+    """The registry every instrumented loop in this process records into."""
+    return _shared_metrics
@@ -0,0 +1,130 @@
+"""
+Frame rate and size normalization for merging clips that don't match.
+
+Merge used to reject clips with different dimensions and wrote every clip
+at the first clip's frame rate, so a 60 fps clip merged after a 30 fps one
+played at half speed. A ClipFormat describes how one source is brought to
+the output format:
+
+- frame rate: output frame k shows the source frame on screen at time
+  k / output_fps, i.e. source frame floor(k * source_fps / output_fps).
+  Frames are repeated or dropped, never blended, and the clip keeps its
+  duration.
+- size: the frame is scaled to fit the output canvas keeping its aspect
+  ratio, with black bars around it ("letterbox"), or scaled to fill the
+  canvas exactly ("stretch").
+
+A FrameNormalizer is the transform stage of the frame pipeline
+(frame_pipeline.py): it scales each decoded frame into a buffer it reuses
+and places it on the pipeline's canvas-sized output buffers, whose bars
+are painted black once when they are allocated. A ClipFormat is a few
+numbers, so it is cheap to send to the segment encoder's worker
+processes, which build their own buffers.
+"""
+import cv2
+import numpy as np
+
+from frame_pipeline import timed_read
+from keyframe_index import seek_frame
+
+FPS_TOLERANCE = 0.01 # Frame rates closer than this are treated as the same
+
+
+class ClipFormat:
+    def __init__(self, source_fps, output_fps, source_size, canvas_size, fit="letterbox"):
+        if fit not in ("letterbox", "stretch"):
+            raise ValueError(f"Unknown fit mode: {fit}")
+        self.source_fps = source_fps
+        self.output_fps = output_fps
+        self.source_size = source_size # (width, height)
+        self.canvas_size = canvas_size # (width, height) of the output
+        self.fit = fit
+
+    def output_count(self, source_count):
+        """How many output frames source_count source frames become."""
+        return int(round(source_count * self.output_fps / self.source_fps))
+
+    def source_index(self, output_index):
+        return int(output_index * self.source_fps / self.output_fps + 1e-6)
+
+    def source_indices(self, start, end):
+        """Source frame numbers for output frames [start, end), ascending, as an array."""
+        return (np.arange(start, end) * (self.source_fps / self.output_fps) + 1e-6).astype(np.int64)
+
+    def placement(self):
+        """(x, y, width, height) of the scaled frame on the canvas."""
+        canvas_width, canvas_height = self.canvas_size
+        if self.fit == "stretch":
+            return 0, 0, canvas_width, canvas_height
+        source_width, source_height = self.source_size
+        scale = min(canvas_width / source_width, canvas_height / source_height)
+        width = max(1, min(canvas_width, int(round(source_width * scale))))
+        height = max(1, min(canvas_height, int(round(source_height * scale))))
+        return (canvas_width - width) // 2, (canvas_height - height) // 2, width, height
+
+    def normalizer(self):
+        return FrameNormalizer(self)
+
+
+class FrameNormalizer:
+    """Scales one source's frames onto the output canvas, reusing its scaling buffer."""
+
+    def __init__(self, clip_format):
+        canvas_width, canvas_height = clip_format.canvas_size
+        self.canvas_shape = (canvas_height, canvas_width, 3)
+        self.x, self.y, self.width, self.height = clip_format.placement()
+        shrinking = self.width * self.height < clip_format.source_size[0] * clip_format.source_size[1]
+        self.interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+        self.fills_canvas = (self.width, self.height) == (canvas_width, canvas_height)
+        self.resizes = (self.width, self.height) != tuple(clip_format.source_size)
+        self._scaled = None if self.fills_canvas else np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def transform(self, frame, dst):
+        """
+        Puts frame on dst, a canvas-sized buffer. With a letterbox only the
+        picture area is written, so dst's bars must already be black.
+        """
+        target = dst if self.fills_canvas else self._scaled
+        if self.resizes:
+            cv2.resize(frame, (self.width, self.height), dst=target, interpolation=self.interpolation)
+        else:
+            np.copyto(target, frame)
+        if not self.fills_canvas:
+            dst[self.y:self.y + self.height, self.x:self.x + self.width] = self._scaled
+
+
+def read_frames_at(cap, indices, position, index=None, buffer=None):
+    """
+    Yields source frame i for each i in indices (ascending, repeats
+    allowed), decoding forward from the first. position is the frame the
+    next read() would return. With a buffer, frames are decoded into it
+    and every yield is that same array. Stops early if the stream ends.
+    """
+    frame = None
+    for source_index in indices:
+        if frame is None and position != source_index:
+            position = seek_frame(cap, int(source_index), position, index)
+        while position <= source_index:
+            ret, frame = timed_read(cap, buffer)
+            if not ret:
+                return
+            position += 1
+        yield frame
+
+
+def clip_formats(infos, canvas_size=None, fps=None, fit="letterbox"):
+    """
+    Works out the output format for clips with the given VideoInfos:
+    canvas_size and fps default to the first clip's. Returns (fps,
+    canvas_size, formats) where formats[i] is the ClipFormat clip i needs,
+    or None if it already matches.
+    """
+    canvas_size = tuple(canvas_size or infos[0].frame_size)
+    fps = fps or infos[0].fps or 25.0
+    formats = []
+    for info in infos:
+        if tuple(info.frame_size) == canvas_size and abs(info.fps - fps) < FPS_TOLERANCE:
+            formats.append(None)
+        else:
+            formats.append(ClipFormat(info.fps or fps, fps, info.frame_size, canvas_size, fit))
+    return fps, canvas_size, formats
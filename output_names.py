@@ -0,0 +1,105 @@
+"""
+Output file names allocated from a persisted counter instead of scanning
+the output folder.
+
+Saving a frame used to list the whole last_frame folder and run a regex
+over every name to find the next _N, and reverse, merge and compile tried
+name_1, name_2, ... with one exists-check each, so every save got slower
+as the folders filled up. OutputNames keeps, in each output folder, a
+small index file with the next number for every base name and extension
+it has handed out. A save reads that file, claims the name it points at
+and writes the number back, whatever the folder holds.
+
+The folder is only scanned the first time a base name is seen there (or
+if the index was deleted), so numbering carries on after existing files.
+Names are still claimed by creating the file with O_EXCL, so two jobs (or
+two processes) can't get the same one: if the index is behind, e.g.
+because another process wrote it at the same moment, the claim fails and
+the next number is tried. Numbers aren't reused after a file is deleted.
+"""
+import json
+import os
+import re
+import threading
+
+INDEX_FILE = ".output_names.json"
+
+
+def claim(path):
+    """Creates path as an empty file if it doesn't exist yet. Returns True if we got it."""
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def _name(base_name, extension, number):
+    """base.ext for number 0, base_N.ext otherwise."""
+    return f"{base_name}{extension}" if number == 0 else f"{base_name}_{number}{extension}"
+
+
+class OutputNames:
+    def __init__(self):
+        self._lock = threading.Lock() # One read-claim-write of an index at a time in this process
+
+    def claim(self, output_dir, base_name, extension, bare_first=True):
+        """
+        Claims and returns the next free output_dir/base_name_N.ext. With
+        bare_first the first one is base_name.ext itself, then _1, _2, ...;
+        otherwise numbering starts at _1.
+        """
+        key = f"{base_name}|{extension}"
+        with self._lock:
+            index = self._load(output_dir)
+            number = index.get(key)
+            if number is None:
+                number = self._scan(output_dir, base_name, extension, bare_first)
+            while not claim(os.path.join(output_dir, _name(base_name, extension, number))):
+                number += 1
+            index[key] = number + 1
+            self._save(output_dir, index)
+        return os.path.join(output_dir, _name(base_name, extension, number))
+
+    def _load(self, output_dir):
+        try:
+            with open(os.path.join(output_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _save(self, output_dir, index):
+        index_path = os.path.join(output_dir, INDEX_FILE)
+        temp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(temp_path, index_path)
+        except OSError:
+            # The name is claimed either way; the next save just scans again.
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def _scan(self, output_dir, base_name, extension, bare_first):
+        """The number after the highest one already in output_dir for this base name."""
+        pattern = re.compile(rf"{re.escape(base_name)}(?:_(\d+))?{re.escape(extension)}")
+        highest = None
+        for filename in os.listdir(output_dir):
+            match = pattern.fullmatch(filename)
+            if match:
+                number = int(match.group(1) or 0)
+                highest = number if highest is None else max(highest, number)
+        if highest is None:
+            return 0 if bare_first else 1
+        return highest + 1
+
+
+_shared_names = OutputNames()
+
+
+def shared_names():
+    """The OutputNames every save in this process goes through."""
+    return _shared_names
@@ -0,0 +1,205 @@
+"""
+Parallel scene export.
+
+Scenes are split into contiguous groups with roughly the same number of
+frames, and each group is exported by its own process. A worker opens the
+source once and walks its scenes in order, so it only has to seek when two
+of its scenes aren't back to back. Workers report frames written through a
+shared queue so the caller can show overall progress. A source that is in
+the frame cache is read from it instead of being decoded. Within a worker,
+each scene goes through a frame pipeline (frame_pipeline.py), so decoding
+and encoding overlap.
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+
+import cv2
+
+from capture_pool import shared_pool
+from frame_pipeline import copy_frames, decode_frames, write_frames
+from job_queue import JobCancelled
+from keyframe_index import seek_frame
+from metrics import shared_metrics
+
+
+def split_contiguous(scenes, groups):
+    """
+    Splits (name, start_frame, end_frame) scenes into at most `groups`
+    contiguous runs with roughly equal frame counts.
+    """
+    if not scenes:
+        return []
+    groups = max(1, min(groups, len(scenes)))
+    total = sum(end - start for _, start, end in scenes)
+    target = total / groups
+
+    runs, current, current_frames = [], [], 0
+    for scene in scenes:
+        current.append(scene)
+        current_frames += scene[2] - scene[1]
+        if current_frames >= target and len(runs) < groups - 1:
+            runs.append(current)
+            current, current_frames = [], 0
+    if current:
+        runs.append(current)
+    return runs
+
+
+def export_scene_run(video_file, scenes, output_dir, frame_cache=None, progress_queue=None):
+    """
+    Writes each (name, start_frame, end_frame) scene to output_dir/name.mp4
+    using a single capture, or the clip's frames in frame_cache if it is
+    there. Returns the number of frames written.
+    """
+    pool = shared_pool()
+    info = pool.info(video_file)
+    frames = frame_cache.get(video_file) if frame_cache else None
+    index = pool.keyframes(video_file) if frames is None else None
+    cap = pool.acquire(video_file) if frames is None else None
+
+    fps = info.fps
+    frame_width, frame_height = info.frame_size
+    frame_shape = (frame_height, frame_width, 3)
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    position = 0 # Captures come out of the pool at the first frame
+    written_total = 0
+
+    def report(count):
+        if progress_queue is not None:
+            progress_queue.put(count)
+
+    try:
+        for name, start_frame, end_frame in scenes:
+            output_path = os.path.join(output_dir, f"{name}.mp4")
+            out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+            if not out.isOpened():
+                raise IOError(f"Could not create output video file: {output_path}")
+
+            try:
+                if frames is not None:
+                    written = write_frames(out, copy_frames(frames[start_frame:end_frame]), frame_shape, report)
+                else:
+                    # Back-to-back scenes carry on from where the last one stopped;
+                    # otherwise seek via the keyframe before the scene and decode forward.
+                    if position != start_frame:
+                        position = seek_frame(cap, start_frame, position, index)
+                    written = write_frames(out, decode_frames(cap, int(end_frame - start_frame)), frame_shape, report)
+                    position += written
+            finally:
+                out.release()
+            written_total += written
+    finally:
+        if cap is not None:
+            pool.release(cap)
+
+    return written_total
+
+
+def export_scenes(video_file, scenes, output_dir, workers=None, frame_cache=None, progress_callback=None):
+    """
+    Exports (name, start_frame, end_frame) scenes across a process pool,
+    reading from frame_cache if the clip is in it.
+
+    progress_callback(frames_written, total_frames) is called from the
+    calling thread as workers report in. Returns the total frames written.
+    """
+    workers = workers or os.cpu_count() or 1
+    total_frames = sum(end - start for _, start, end in scenes)
+    runs = split_contiguous(scenes, workers)
+
+    if len(runs) <= 1:
+        # Not worth starting processes for a single run.
+        return export_scene_run(video_file, scenes, output_dir, frame_cache,
+                                CallbackQueue(total_frames, progress_callback))
+
+    # Build the keyframe index once here, not in every worker.
+    shared_pool().keyframes(video_file)
+    jobs = [(video_file, run, output_dir, frame_cache) for run in runs]
+    return sum(run_in_pool(export_scene_run, jobs, total_frames, progress_callback))
+
+
+class CallbackQueue:
+    """Stands in for a progress queue in this process: put() goes straight to progress_callback."""
+
+    def __init__(self, total, callback):
+        self.done = 0
+        self.total = total
+        self.callback = callback
+
+    def put(self, count):
+        self.done += count
+        if self.callback:
+            self.callback(self.done, self.total)
+
+
+class _ProgressChannel:
+    """
+    What workers get as their progress_queue. put() forwards the count to
+    the parent and raises JobCancelled once the parent has asked to stop,
+    so a cancelled job's workers stop at their next report.
+    """
+
+    def __init__(self, counts, stop_event):
+        self.counts = counts
+        self.stop_event = stop_event
+
+    def put(self, count):
+        if self.stop_event.is_set():
+            raise JobCancelled("Stopped by the parent process.")
+        self.counts.put(count)
+
+
+def _run_with_metrics(func, *args):
+    """Runs a pool job with fresh metrics. Returns (result, metrics snapshot) so the parent can merge them."""
+    metrics = shared_metrics()
+    metrics.reset() # Pool processes run several jobs
+    result = func(*args)
+    return result, metrics.snapshot()
+
+
+def run_in_pool(func, jobs, total_frames, progress_callback=None):
+    """
+    Runs func(*job_args, progress_queue) for every job in its own process.
+    Workers put frame counts on progress_queue; progress_callback(done, total)
+    is called from the calling thread as they arrive. Returns the results
+    in job order and re-raises the first worker error, if any. Each
+    worker's metrics are merged into this process's shared metrics. If
+    progress_callback raises (e.g. JobCancelled), the workers are told to
+    stop and the exception is re-raised once they have.
+
+    Workers are spawned, not forked: a forked worker would inherit the open
+    captures in this process's capture pool and share their decoder state
+    and file offset with its siblings.
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        stop_event = manager.Event()
+        channel = _ProgressChannel(manager.Queue(), stop_event)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(jobs), mp_context=context) as pool:
+            futures = [pool.submit(_run_with_metrics, func, *job_args, channel) for job_args in jobs]
+
+            done_frames = 0
+            try:
+                while True:
+                    try:
+                        done_frames += channel.counts.get(timeout=0.2)
+                        if progress_callback:
+                            progress_callback(done_frames, total_frames)
+                    except queue.Empty:
+                        if all(future.done() for future in futures):
+                            break
+            except BaseException:
+                stop_event.set()
+                for future in futures:
+                    future.cancel()
+                concurrent.futures.wait(futures)
+                raise
+
+            results = []
+            for future in futures:
+                result, snapshot = future.result()
+                shared_metrics().merge(snapshot)
+                results.append(result)
+            return results
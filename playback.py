@@ -0,0 +1,123 @@
+"""
+Playback engine for the GUI preview.
+
+A background thread decodes into a small bounded queue, so cap.read()
+never runs on the Tk main loop. The main loop asks for the frame that is
+due "now" according to a monotonic clock started at the first frame;
+frames that are already late by then are dropped instead of shown, so
+playback keeps real time instead of drifting when display work is slow.
+"""
+import collections
+import queue
+import threading
+import time
+
+from capture_pool import shared_pool
+
+DEFAULT_QUEUE_SIZE = 8
+FALLBACK_FPS = 25.0
+
+
+class PlaybackEngine:
+    def __init__(self, video_file, queue_size=DEFAULT_QUEUE_SIZE):
+        self.video_file = video_file
+        self.fps = FALLBACK_FPS
+        self.frames_shown = 0
+        self.frames_dropped = 0
+
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._decoder_done = threading.Event()
+        self._thread = None
+        self._start_time = None
+        self._pending = None # (index, frame) taken from the queue but not due yet
+        self._show_times = collections.deque(maxlen=30)
+
+    def start(self):
+        """Opens the video and starts the decode thread. Raises IOError if it can't be opened."""
+        pool = shared_pool()
+        try:
+            cap = pool.acquire(self.video_file)
+        except IOError:
+            raise IOError("Could not open the video file for playback.")
+
+        fps = pool.info(self.video_file).fps
+        if fps > 0:
+            self.fps = fps
+
+        self._thread = threading.Thread(target=self._decode_loop, args=(cap,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the decode thread. Safe to call more than once."""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def _decode_loop(self, cap):
+        index = 0
+        try:
+            while not self._stop_event.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                while not self._stop_event.is_set():
+                    try:
+                        self._frames.put((index, frame), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                index += 1
+        finally:
+            # Back to the pool, so replaying or processing this clip doesn't reopen it.
+            shared_pool().release(cap)
+            self._decoder_done.set()
+
+    def next_frame(self, now=None):
+        """
+        Returns the newest frame that is due at `now` (monotonic seconds), or
+        None if nothing new is due yet. Older due frames are dropped.
+        """
+        now = time.monotonic() if now is None else now
+        if self._start_time is None:
+            self._start_time = now
+        due_index = int((now - self._start_time) * self.fps)
+
+        frame_to_show = None
+        while True:
+            if self._pending is None:
+                try:
+                    self._pending = self._frames.get_nowait()
+                except queue.Empty:
+                    break
+            index, frame = self._pending
+            if index > due_index:
+                break
+            if frame_to_show is not None:
+                self.frames_dropped += 1
+            frame_to_show = frame
+            self._pending = None
+
+        if frame_to_show is not None:
+            self.frames_shown += 1
+            self._show_times.append(now)
+        return frame_to_show
+
+    def seconds_until_next(self, now=None):
+        """How long the UI can sleep before the next frame is due."""
+        now = time.monotonic() if now is None else now
+        if self._pending is not None and self._start_time is not None:
+            return max(0.0, self._start_time + self._pending[0] / self.fps - now)
+        # Nothing decoded yet: check back in half a frame.
+        return 0.5 / self.fps
+
+    def is_finished(self):
+        """True once every decoded frame has been handed out."""
+        return self._decoder_done.is_set() and self._pending is None and self._frames.empty()
+
+    def achieved_fps(self):
+        """Frames actually shown per second over the last few frames."""
+        if len(self._show_times) < 2:
+            return 0.0
+        span = self._show_times[-1] - self._show_times[0]
+        return (len(self._show_times) - 1) / span if span > 0 else 0.0
@@ -0,0 +1,89 @@
+"""
+Progress window for a scheduled job: a progress bar, how much has been
+processed, the rate and the ETA, and a Cancel button. Jobs that produce
+results as they go (e.g. scenes found during analysis) can also list
+them in the window.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+
+def format_duration(seconds):
+    """1:05 or 1:02:05 style."""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class JobProgressWindow(tk.Toplevel):
+    def __init__(self, master, job, unit="frames", show_items=False):
+        super().__init__(master)
+        self.job = job
+        self.unit = unit # What the job's progress counts, e.g. "frames" or "clips"
+        self.item_list = None # Listbox of results so far, if show_items
+        self.title(job.name)
+        self.geometry("500x360" if show_items else "500x170")
+        self.configure(bg="#2c3e50")
+        self.resizable(False, False)
+
+        self.status = tk.StringVar(value="Waiting for other jobs to finish...")
+
+        tk.Label(self, text=job.name, bg="#2c3e50", fg="#ecf0f1", font=("Arial", 14, "bold")).pack(pady=(15, 10))
+        self.progress_bar = ttk.Progressbar(self, mode="determinate", maximum=100, length=440)
+        self.progress_bar.pack(padx=20)
+        tk.Label(self, textvariable=self.status, bg="#2c3e50", fg="#95a5a6", font=("Arial", 10)).pack(pady=(8, 8))
+        self.cancel_button = tk.Button(self, text="Cancel", command=self.cancel, bg="#e74c3c", fg="#ecf0f1",
+                                       relief=tk.FLAT, font=("Arial", 10, "bold"))
+        self.cancel_button.pack()
+
+        if show_items:
+            self.item_list = tk.Listbox(self, bg="#34495e", fg="#ecf0f1", relief=tk.FLAT, height=8)
+            self.item_list.pack(fill=tk.BOTH, expand=True, padx=20, pady=(10, 15))
+
+        # Closing the window is the same as cancelling the job.
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+    def cancel(self):
+        self.job.cancel()
+        self.cancel_button.config(text="Cancelling...", state=tk.DISABLED)
+
+    def set_item(self, index, text):
+        """Shows text as result number index, adding rows as needed. Call from the Tk thread."""
+        if self.item_list is None or not self.winfo_exists():
+            return
+        while self.item_list.size() <= index:
+            self.item_list.insert(tk.END, "")
+        self.item_list.delete(index)
+        self.item_list.insert(index, text)
+        self.item_list.see(index)
+
+    def update_progress(self, job=None):
+        """Refreshes the bar and status line from the job. Call from the Tk thread."""
+        if not self.winfo_exists():
+            return
+        job = job or self.job
+        if job.cancelled:
+            return
+        if job.state == "queued":
+            return
+        if job.total <= 0:
+            # Nothing to measure against yet: just show that it's alive.
+            if self.progress_bar["mode"] != "indeterminate":
+                self.progress_bar.config(mode="indeterminate")
+                self.progress_bar.start(15)
+            self.status.set("Working...")
+            return
+
+        if self.progress_bar["mode"] != "determinate":
+            self.progress_bar.stop()
+            self.progress_bar.config(mode="determinate")
+        percent = min(100, job.done * 100 // job.total)
+        self.progress_bar["value"] = percent
+        status = f"{job.done} / {job.total} {self.unit} ({percent}%)  |  {job.rate():.1f} {self.unit}/s"
+        eta = job.eta_seconds()
+        if eta is not None:
+            status += f"  |  {format_duration(eta)} left"
+        self.status.set(status)
@@ -0,0 +1,148 @@
+"""
+Low-resolution preview proxies and poster thumbnails for the clip list.
+
+Playing a 4K original just to preview it makes selecting and reordering
+clips sluggish. When a clip is added, a background thread makes a small
+proxy video and a poster image for it and keeps them in an on-disk cache
+(keyed by the same file fingerprint as the scene cache, with least
+recently used eviction). Previews then play the proxy; every operation
+that writes output still reads the original.
+"""
+import os
+import queue
+import threading
+
+import cv2
+
+from ffmpeg_tools import find_ffmpeg, run_ffmpeg
+from frame_pipeline import decode_frames, write_frames
+from scene_cache import evict_lru, file_fingerprint
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024 # 2 GB of proxies
+PROXY_HEIGHT = 360
+
+
+class ProxyCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, proxy_height=PROXY_HEIGHT):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.proxy_height = proxy_height
+
+    def _paths(self, video_file):
+        key = f"{file_fingerprint(video_file)}_{self.proxy_height}"
+        return (os.path.join(self.cache_dir, f"{key}.mp4"),
+                os.path.join(self.cache_dir, f"{key}.jpg"))
+
+    def lookup(self, video_file):
+        """Returns (proxy_path, poster_path) if both are cached, else None."""
+        proxy_path, poster_path = self._paths(video_file)
+        if not (os.path.exists(proxy_path) and os.path.exists(poster_path)):
+            return None
+        # Touch the entry so eviction treats it as recently used.
+        for path in (proxy_path, poster_path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return proxy_path, poster_path
+
+    def generate(self, video_file):
+        """Makes (or reuses) the proxy and poster for video_file. Returns their paths."""
+        cached = self.lookup(video_file)
+        if cached:
+            return cached
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        proxy_path, poster_path = self._paths(video_file)
+        # Write under temporary names so a half-written proxy is never picked up.
+        temp_proxy = proxy_path + ".part.mp4"
+        temp_poster = poster_path + ".part.jpg"
+        try:
+            self._make_poster(video_file, temp_poster)
+            try:
+                if not find_ffmpeg():
+                    raise RuntimeError("ffmpeg was not found on the PATH.")
+                # Never upscale: clips already smaller than the proxy height keep theirs (rounded to even).
+                height = f"trunc(min(ih,{self.proxy_height})/2)*2"
+                run_ffmpeg(["-i", video_file, "-an", "-vf", f"scale=-2:'{height}'",
+                            "-c:v", "libx264", "-preset", "veryfast", "-crf", "28", temp_proxy])
+            except RuntimeError:
+                # No ffmpeg (or no libx264 in it): let OpenCV make the proxy.
+                self._make_proxy_opencv(video_file, temp_proxy)
+            os.replace(temp_proxy, proxy_path)
+            os.replace(temp_poster, poster_path)
+        finally:
+            for path in (temp_proxy, temp_poster):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        evict_lru(self.cache_dir, self.max_bytes, (".mp4", ".jpg"))
+        return proxy_path, poster_path
+
+    def _scaled_size(self, width, height):
+        scale = min(1.0, self.proxy_height / height) if height > 0 else 1.0
+        # Even sizes keep every codec happy.
+        return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+    def _make_poster(self, video_file, poster_path):
+        cap = cv2.VideoCapture(video_file)
+        try:
+            ret, frame = cap.read()
+        finally:
+            cap.release()
+        if not ret:
+            raise IOError(f"Could not read a frame from: {video_file}")
+        size = self._scaled_size(frame.shape[1], frame.shape[0])
+        if not cv2.imwrite(poster_path, cv2.resize(frame, size, interpolation=cv2.INTER_AREA)):
+            raise IOError(f"Could not write poster: {poster_path}")
+
+    def _make_proxy_opencv(self, video_file, proxy_path):
+        cap = cv2.VideoCapture(video_file)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video file: {video_file}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        size = self._scaled_size(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        out = cv2.VideoWriter(proxy_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+        if not out.isOpened():
+            cap.release()
+            raise IOError(f"Could not create proxy file: {proxy_path}")
+
+        def scale(frame, dst):
+            cv2.resize(frame, size, dst=dst, interpolation=cv2.INTER_AREA)
+
+        frame_shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+        try:
+            write_frames(out, decode_frames(cap), frame_shape, transform=scale, output_shape=(size[1], size[0], 3))
+        finally:
+            cap.release()
+            out.release()
+
+
+class ProxyGenerator:
+    """
+    Makes proxies on a single background thread, one clip at a time, so it
+    never competes with the UI for more than one core. on_ready(video_file,
+    proxy_path, poster_path) is called from that thread when a clip is done.
+    """
+
+    def __init__(self, proxy_cache, on_ready=None):
+        self.proxy_cache = proxy_cache
+        self.on_ready = on_ready
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, video_file):
+        self._requests.put(video_file)
+
+    def _run(self):
+        while True:
+            video_file = self._requests.get()
+            try:
+                proxy_path, poster_path = self.proxy_cache.generate(video_file)
+            except Exception:
+                # No proxy just means the preview plays the original.
+                continue
+            if self.on_ready:
+                self.on_ready(video_file, proxy_path, poster_path)
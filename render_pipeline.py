@@ -0,0 +1,95 @@
+"""
+Render pipeline that puts one decoded frame on several Tk labels.
+
+Showing a frame on the video and preview labels used to do the full
+resize + BGR->RGB + new PhotoImage work once per label. Here each frame is
+scaled once to the largest label size and colour-converted once at that
+size, and smaller label sizes are scaled from the converted image. The
+scaled/converted pixels go into buffers that are reused from frame to
+frame, and each label's PhotoImage is updated in place with paste() for
+as long as its size stays the same.
+"""
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+def fit_size(frame_shape, label_width, label_height):
+    """Largest (width, height) that fits the label and keeps the frame's aspect ratio, or None."""
+    if label_width <= 1 or label_height <= 1:
+        return None
+    h, w = frame_shape[:2]
+    aspect_ratio = w / h
+    new_w = label_width
+    new_h = int(new_w / aspect_ratio)
+
+    if new_h > label_height:
+        new_h = label_height
+        new_w = int(new_h * aspect_ratio)
+    if new_w < 1 or new_h < 1:
+        return None
+    return new_w, new_h
+
+
+class FrameRenderer:
+    def __init__(self):
+        self._bgr_buffers = {} # (width, height) -> scaled BGR pixels
+        self._rgb_buffers = {} # (width, height) -> scaled RGB pixels
+        self._photos = {} # label -> PhotoImage shown on it
+        self._label_sizes = {} # label -> size it was last rendered at
+
+    @staticmethod
+    def _buffer(buffers, size):
+        buffer = buffers.get(size)
+        if buffer is None:
+            buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            buffers[size] = buffer
+        return buffer
+
+    def render(self, frame, labels):
+        """Displays a BGR frame on every label in labels."""
+        targets = {} # size -> labels that want it
+        for label in labels:
+            size = fit_size(frame.shape, label.winfo_width(), label.winfo_height())
+            if size:
+                targets.setdefault(size, []).append(label)
+        if not targets:
+            return
+
+        # Convert colour once, on the biggest image we need, then derive the rest from it.
+        sizes = sorted(targets, key=lambda size: size[0] * size[1], reverse=True)
+        largest = sizes[0]
+        scaled = cv2.resize(frame, largest, dst=self._buffer(self._bgr_buffers, largest))
+        rendered = {largest: cv2.cvtColor(scaled, cv2.COLOR_BGR2RGB, dst=self._buffer(self._rgb_buffers, largest))}
+        for size in sizes[1:]:
+            rendered[size] = cv2.resize(rendered[largest], size, dst=self._buffer(self._rgb_buffers, size),
+                                        interpolation=cv2.INTER_AREA)
+
+        for size, size_labels in targets.items():
+            image = Image.fromarray(rendered[size])
+            for label in size_labels:
+                self._show(label, image)
+                self._label_sizes[label] = size
+
+        # Drop buffers for sizes no label is shown at any more (e.g. after a window
+        # resize). A label that wasn't rendered this time keeps its size's buffers.
+        in_use = set(self._label_sizes.values())
+        for buffers in (self._bgr_buffers, self._rgb_buffers):
+            for size in [size for size in buffers if size not in in_use]:
+                del buffers[size]
+
+    def _show(self, label, image):
+        photo = self._photos.get(label)
+        if photo is not None and (photo.width(), photo.height()) == image.size:
+            photo.paste(image)
+            return
+
+        photo = ImageTk.PhotoImage(image)
+        self._photos[label] = photo
+        label.config(image=photo)
+        label.image = photo
+
+    def forget(self):
+        """Lets go of the PhotoImages, e.g. when playback stops and the labels are cleared."""
+        self._photos.clear()
+        self._label_sizes.clear()
@@ -0,0 +1,192 @@
+"""
+Bounded-memory reverse engine.
+
+The old reverse path decoded every frame into a Python list before writing
+anything, so memory grew with the length of the clip. Here the clip is
+processed in chunks that fit under a memory ceiling:
+
+- "seek" (default): walk the clip from the last chunk to the first, seek to
+  the start of each chunk, decode it into a reusable buffer and write it out
+  back-to-front. Nothing touches the disk except the output file. Without
+  a keyframe index the frame count is only OpenCV's estimate, so the real
+  end is found first by decoding forward from just before the estimate.
+- "spill": decode the clip once front-to-back, spill each chunk to a raw temp
+  file, then read the chunks back last-to-first. Use this for files where
+  seeking is unreliable. Raw frames are big (about 6 MB a frame at 1080p),
+  so it checks that the temp folder has room for the whole clip first.
+
+Either way peak memory is roughly one chunk, no matter how long the clip is.
+The reversed frames go to the writer through a frame pipeline
+(frame_pipeline.py), so the next chunk is decoded while this one encodes.
+"""
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+from capture_pool import shared_pool
+from frame_pipeline import timed_read, write_frames
+from keyframe_index import seek_frame
+
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024  # 256 MB of decoded frames per chunk
+
+
+def chunk_size_for(frame_width, frame_height, memory_limit):
+    """Returns how many BGR frames fit under the memory limit (at least one)."""
+    frame_bytes = frame_width * frame_height * 3
+    return max(1, int(memory_limit // frame_bytes))
+
+
+def reverse_video(input_path, output_path, memory_limit=DEFAULT_MEMORY_LIMIT, strategy="seek",
+                  temp_dir=None, progress_callback=None):
+    """
+    Writes input_path to output_path with the frame order reversed.
+
+    progress_callback(frames_written, total_frames) is called after every
+    chunk. Returns the number of frames written.
+    """
+    pool = shared_pool()
+    info = pool.info(input_path)
+    frame_width, frame_height = info.frame_size
+    fps = info.fps
+    total_frames = pool.exact_frame_count(input_path)
+
+    chunk_frames = chunk_size_for(frame_width, frame_height, memory_limit)
+    buffer = np.empty((chunk_frames, frame_height, frame_width, 3), dtype=np.uint8)
+
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+    if not out.isOpened():
+        raise IOError(f"Could not create output video file: {output_path}")
+
+    cap = pool.acquire(input_path)
+    try:
+        if strategy == "seek":
+            if total_frames <= 0:
+                # No keyframe index: don't trust the estimate to plan the seeks.
+                total_frames = find_end(cap, info.frame_count, chunk_frames)
+            return _reverse_by_seeking(cap, out, buffer, total_frames, progress_callback,
+                                       pool.keyframes(input_path))
+        elif strategy == "spill":
+            _check_spill_space(temp_dir, info.frame_count, frame_width * frame_height * 3)
+            return _reverse_by_spilling(cap, out, buffer, temp_dir, progress_callback)
+        else:
+            raise ValueError(f"Unknown reverse strategy: {strategy}")
+    finally:
+        pool.release(cap)
+        out.release()
+
+
+def find_end(cap, estimate, step):
+    """
+    The number of frames an open capture really has, given OpenCV's
+    estimate: seeks to just before the estimate and counts the frames that
+    still decode. If that is already past the end, backs off by step, 2 *
+    step, ... frames. With no estimate the whole stream is counted. Leaves
+    the capture at the end of the stream.
+    """
+    target = max(0, estimate - 1)
+    back_off = step
+    while True:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        decoded = 0
+        while cap.grab():
+            decoded += 1
+        if decoded or target == 0:
+            return target + decoded
+        target = max(0, target - back_off)
+        back_off *= 2
+
+
+def _check_spill_space(temp_dir, frame_count, frame_bytes):
+    """Raises IOError if the spill folder can't hold frame_count raw frames (when the count is known)."""
+    spill_dir = temp_dir or tempfile.gettempdir()
+    needed = frame_count * frame_bytes
+    free = shutil.disk_usage(spill_dir).free
+    if needed > free:
+        raise IOError(f"Reversing by spilling needs about {needed / 1024 ** 3:.1f} GB of raw frames in "
+                      f"'{spill_dir}' but only {free / 1024 ** 3:.1f} GB is free. Use the seek strategy instead.")
+
+
+def _read_chunk(cap, buffer, max_frames):
+    """Decodes up to max_frames frames into buffer. Returns how many were read."""
+    count = 0
+    while count < max_frames:
+        ret, frame = timed_read(cap)
+        if not ret:
+            break
+        buffer[count] = frame
+        count += 1
+    return count
+
+
+def _send_reversed(pipeline, buffer, count):
+    for i in range(count - 1, -1, -1):
+        pipeline.send_copy(buffer[i])
+
+
+def reverse_range(cap, out, buffer, start_frame, end_frame, report=None, index=None):
+    """
+    Writes frames [start_frame, end_frame) of an open capture to out in
+    reverse order, decoding one buffer-sized chunk at a time. report(count)
+    is called as frames are written. index is the file's KeyframeIndex, if
+    it has one. Returns the number of frames written.
+    """
+    chunk_frames = len(buffer)
+
+    def decode(pipeline):
+        for chunk_start in reversed(range(start_frame, end_frame, chunk_frames)):
+            seek_frame(cap, chunk_start, index=index)
+            count = _read_chunk(cap, buffer, min(chunk_frames, end_frame - chunk_start))
+            _send_reversed(pipeline, buffer, count)
+
+    return write_frames(out, decode, buffer.shape[1:], report)
+
+
+def _progress_counter(total_frames, progress_callback):
+    """report(count) function that turns counts into progress_callback(frames_written, total_frames)."""
+    progress = [0]
+
+    def report(count):
+        progress[0] += count
+        if progress_callback:
+            progress_callback(progress[0], total_frames)
+
+    return report
+
+
+def _reverse_by_seeking(cap, out, buffer, total_frames, progress_callback, index=None):
+    return reverse_range(cap, out, buffer, 0, total_frames, _progress_counter(total_frames, progress_callback),
+                         index)
+
+
+def _reverse_by_spilling(cap, out, buffer, temp_dir, progress_callback):
+    chunk_frames = len(buffer)
+    spill_dir = tempfile.mkdtemp(prefix="reverse_", dir=temp_dir)
+    chunks = []  # (path, frame_count) in decode order
+
+    try:
+        while True:
+            count = _read_chunk(cap, buffer, chunk_frames)
+            if count == 0:
+                break
+            chunk_path = os.path.join(spill_dir, f"chunk_{len(chunks)}.raw")
+            buffer[:count].tofile(chunk_path)
+            chunks.append((chunk_path, count))
+            if count < chunk_frames:
+                break
+
+        total_frames = sum(count for _, count in chunks)
+
+        def decode(pipeline):
+            for chunk_path, count in reversed(chunks):
+                with open(chunk_path, "rb") as f:
+                    f.readinto(buffer[:count])
+                os.remove(chunk_path)
+                _send_reversed(pipeline, buffer, count)
+
+        return write_frames(out, decode, buffer.shape[1:], _progress_counter(total_frames, progress_callback))
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
@@ -0,0 +1,341 @@
+"""
+Scene analysis that drives the PySceneDetect detectors directly from an
+OpenCV decode loop instead of going through SceneManager.
+
+Owning the decode loop lets us do more than detect in the same pass - for
+example writing the compiled output while the cuts are still being found,
+so the video is only decoded once.
+
+PySceneDetect 0.7 changed process_frame() to take the frame's position as
+a FrameTimecode (0.6 takes the frame number) and to report cuts the same
+way; detect_frame() and finish_detection() hide the difference, so the loops here count plain frame
+numbers on either version.
+"""
+import collections
+import os
+import re
+
+import cv2
+import numpy as np
+import scenedetect
+from scenedetect import FrameTimecode
+from scenedetect.detectors import ContentDetector
+
+from capture_pool import shared_pool
+from frame_pipeline import timed_read, write_frames
+from keyframe_index import seek_frame
+from metrics import shared_metrics
+
+# SceneManager shrinks frames to roughly this width before detection.
+DETECTION_WIDTH = 256
+# PySceneDetect 0.7+ detectors take and return FrameTimecodes instead of frame numbers.
+TIMECODE_DETECTORS = tuple(int(part) for part in re.findall(r"\d+", scenedetect.__version__)[:2]) >= (0, 7)
+
+
+def default_downscale(frame_width):
+    """Same automatic downscale factor SceneManager uses."""
+    return max(1, frame_width // DETECTION_WIDTH)
+
+
+def detection_frame(frame, downscale):
+    """Returns the (view of the) frame the detector should look at."""
+    if downscale > 1:
+        return frame[::downscale, ::downscale, :]
+    return frame
+
+
+def build_scene_list(cuts, start_frame, end_frame, fps):
+    """
+    Turns cut frame numbers into the (start, end) FrameTimecode pairs that
+    SceneManager.get_scene_list() returns. No cuts means no scenes.
+    """
+    cuts = sorted(c for c in set(cuts) if start_frame < c < end_frame)
+    if not cuts:
+        return []
+    boundaries = [start_frame] + cuts + [end_frame]
+    return [(FrameTimecode(boundaries[i], fps=fps), FrameTimecode(boundaries[i + 1], fps=fps))
+            for i in range(len(boundaries) - 1)]
+
+
+def _detector_lag(detector, stride=1):
+    # A detector can report a cut up to min_scene_len frames after it happened
+    # (e.g. ContentDetector's flash filter), so frames are only final once
+    # they are that far behind the decode position. A batching detector
+    # reports up to a batch (of every stride-th frame) late.
+    lag = int(getattr(detector, "min_scene_len", 15) or 15) + 1
+    return max(lag, getattr(detector, "batch_size", 0) * stride + 1)
+
+
+def _position(detector, frame_num, fps):
+    """What detector's process_frame()/post_process() take for frame_num."""
+    if TIMECODE_DETECTORS and type(detector).__module__.startswith("scenedetect"):
+        return FrameTimecode(frame_num, fps=fps)
+    # PySceneDetect 0.6 and our own detectors (BatchDetector) count frames.
+    return frame_num
+
+
+def _frame_numbers(cuts):
+    return [cut.get_frames() if isinstance(cut, FrameTimecode) else cut for cut in cuts or []]
+
+
+def detect_frame(detector, frame_num, frame, fps):
+    """
+    detector.process_frame(), recorded in the shared metrics. Returns the
+    cuts as frame numbers, whichever PySceneDetect version is installed.
+    """
+    return _frame_numbers(_timed_process_frame(detector.process_frame, _position(detector, frame_num, fps), frame))
+
+
+def finish_detection(detector, frame_num, fps):
+    """detector.post_process() at the end of the video, if it has one. Returns cut frame numbers."""
+    if not hasattr(detector, "post_process"):
+        return []
+    return _frame_numbers(detector.post_process(_position(detector, frame_num, fps)))
+
+
+def _timed_process_frame(process_frame, frame_num, frame):
+    metrics = shared_metrics()
+    with metrics.timer("detect"):
+        cuts = process_frame(frame_num, frame)
+    metrics.count("frames_detected")
+    return cuts
+
+
+def timed_detector(detector):
+    """
+    Makes detector record its process_frame() calls in the shared metrics
+    like detect_frame() does, for detectors driven by a PySceneDetect
+    SceneManager rather than by our own loops. Returns detector.
+    """
+    process_frame = detector.process_frame
+    detector.process_frame = lambda frame_num, frame: _timed_process_frame(process_frame, frame_num, frame)
+    return detector
+
+
+def content_score(previous_frame, frame):
+    """
+    Mean absolute HSV difference between two frames - the same measure
+    ContentDetector thresholds on, with equal channel weights.
+    """
+    previous_hsv = cv2.cvtColor(previous_frame, cv2.COLOR_BGR2HSV)
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    return float(cv2.absdiff(previous_hsv, hsv).mean())
+
+
+def strongest_change(numbered_frames, downscale, default):
+    """
+    Given consecutive (frame_num, frame) pairs, returns the frame number that
+    differs most from the frame before it, or default if there is no pair.
+    """
+    best_frame, best_score = default, -1.0
+    for (_, previous), (frame_num, frame) in zip(numbered_frames, numbered_frames[1:]):
+        score = content_score(detection_frame(previous, downscale), detection_frame(frame, downscale))
+        if score > best_score:
+            best_frame, best_score = frame_num, score
+    return best_frame
+
+
+def refine_cut(cap, candidate, stride, downscale, index=None):
+    """
+    The detector only saw every stride-th frame, so a cut reported at
+    `candidate` really happened somewhere in (candidate - stride, candidate].
+    Decodes just that window and returns the frame with the largest change.
+    index is the file's KeyframeIndex, if it has one.
+    """
+    first = max(0, candidate - stride)
+    seek_frame(cap, first, index=index)
+    numbered_frames = []
+    for frame_num in range(first, candidate + 1):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        numbered_frames.append((frame_num, frame))
+    return strongest_change(numbered_frames, downscale, candidate)
+
+
+def detect_scenes_fast(video_file, downscale=None, stride=1, detector=None, progress_callback=None):
+    """
+    Fast analysis mode: the detector looks at frames shrunk by `downscale`
+    and only at every `stride`-th frame (the others are grabbed but never
+    converted). Each candidate cut is then moved to the exact frame by
+    decoding only the `stride` frames before it.
+
+    Returns the scene list in the same format as SceneManager.
+    """
+    detector = detector or ContentDetector()
+    stride = max(1, int(stride))
+    pool = shared_pool()
+    info = pool.info(video_file)
+    fps = info.fps
+    total_frames = info.frame_count
+    cap = pool.acquire(video_file)
+
+    try:
+        if downscale is None:
+            downscale = default_downscale(info.width)
+
+        candidates = []
+        frame_num = 0
+        while True:
+            if frame_num % stride == 0:
+                ret, frame = timed_read(cap)
+                if not ret:
+                    break
+                candidates.extend(detect_frame(detector, frame_num, detection_frame(frame, downscale), fps))
+            elif not cap.grab():
+                break
+            frame_num += 1
+            if progress_callback and frame_num % 100 == 0:
+                progress_callback(frame_num, total_frames)
+
+        candidates.extend(finish_detection(detector, frame_num, fps))
+
+        if stride > 1:
+            index = pool.keyframes(video_file)
+            candidates = [refine_cut(cap, c, stride, downscale, index) for c in sorted(set(candidates))]
+    finally:
+        pool.release(cap)
+
+    return build_scene_list(candidates, 0, frame_num, fps)
+
+
+def detect_scenes_incremental(video_file, on_scene=None, detector=None, downscale=None, stride=1,
+                              progress_callback=None):
+    """
+    Detects scenes like detect_scenes_fast, but calls on_scene(start, end)
+    with FrameTimecodes for every scene as soon as the cut that ends it is
+    found, so work on the first scenes can start while the rest of the file
+    is still being analysed. Scenes arrive in order; the last one is
+    reported when the file ends. Returns the full scene list.
+
+    With a stride, cuts are refined from a small ring of recent detection
+    frames instead of seeking back, so the file is read front to back once.
+    progress_callback(frames_done, total_frames) is called periodically.
+    """
+    detector = detector or ContentDetector()
+    stride = max(1, int(stride))
+    pool = shared_pool()
+    info = pool.info(video_file)
+    fps = info.fps
+    total_frames = info.frame_count
+    if downscale is None:
+        downscale = default_downscale(info.width)
+
+    ring = collections.deque(maxlen=_detector_lag(detector, stride) + stride) # (frame_num, detection frame)
+    cuts = [0]
+
+    def add_cut(cut):
+        # Cuts come in order; a refined one can't go back past the last scene.
+        if cut <= cuts[-1]:
+            return
+        if on_scene:
+            on_scene(FrameTimecode(cuts[-1], fps=fps), FrameTimecode(cut, fps=fps))
+        cuts.append(cut)
+
+    cap = pool.acquire(video_file)
+    frame_num = 0
+    try:
+        while True:
+            ret, frame = timed_read(cap)
+            if not ret:
+                break
+            small = detection_frame(frame, downscale)
+            if stride > 1:
+                # A copy, so the ring doesn't keep whole frames alive through the view.
+                ring.append((frame_num, np.ascontiguousarray(small)))
+            if frame_num % stride == 0:
+                for cut in detect_frame(detector, frame_num, small, fps):
+                    if stride > 1:
+                        window = [item for item in ring if cut - stride <= item[0] <= cut]
+                        cut = strongest_change(window, 1, cut)
+                    add_cut(cut)
+            frame_num += 1
+            if progress_callback and frame_num % 100 == 0:
+                progress_callback(frame_num, total_frames)
+    finally:
+        pool.release(cap)
+
+    for cut in sorted(finish_detection(detector, frame_num, fps)):
+        if cut < frame_num:
+            add_cut(cut)
+    if len(cuts) == 1:
+        return []
+    add_cut(frame_num)
+    return build_scene_list(cuts[1:-1], 0, frame_num, fps)
+
+
+def detect_and_compile(video_file, output_path, detector=None, downscale=None, stride=1, progress_callback=None):
+    """
+    Detects scenes and writes every detected scene into output_path in a
+    single decode pass.
+
+    Decoded frames wait in a small ring buffer until no later cut can still
+    land on them, then go on to the writer. Decoding and detection run on
+    a frame pipeline's decoder thread while this thread encodes. Returns the scene list;
+    if no cuts were found the output file is removed and [] is returned.
+    downscale and stride work as in detect_scenes_fast; with a stride the
+    frames needed to refine each cut are still in the ring, so no extra
+    decoding is needed.
+    progress_callback(frames_done, total_frames) is called periodically.
+    """
+    detector = detector or ContentDetector()
+    pool = shared_pool()
+    info = pool.info(video_file)
+    frame_width, frame_height = info.frame_size
+    fps = info.fps
+    total_frames = info.frame_count
+    if downscale is None:
+        downscale = default_downscale(frame_width)
+
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+    if not out.isOpened():
+        raise IOError(f"Could not create output video file: {output_path}")
+
+    cap = pool.acquire(video_file)
+    stride = max(1, int(stride))
+    ring_size = _detector_lag(detector, stride) + stride
+    cuts = []
+    decoded = [0]
+    written = [0]
+
+    def decode(pipeline):
+        ring = collections.deque()
+        frame_num = 0
+        while True:
+            ret, frame = timed_read(cap)
+            if not ret:
+                break
+            ring.append((frame_num, frame))
+            if frame_num % stride == 0:
+                for cut in detect_frame(detector, frame_num, detection_frame(frame, downscale), fps):
+                    if stride > 1:
+                        window = [item for item in ring if cut - stride <= item[0] <= cut]
+                        cut = strongest_change(window, downscale, cut)
+                    cuts.append(cut)
+            # Every scene is kept, so a frame that has left the lag window
+            # is decided and can be encoded right away.
+            if len(ring) > ring_size:
+                pipeline.send_copy(ring.popleft()[1])
+            frame_num += 1
+            decoded[0] = frame_num
+
+        cuts.extend(finish_detection(detector, frame_num, fps))
+        while ring:
+            pipeline.send_copy(ring.popleft()[1])
+
+    def report(count):
+        written[0] += count
+        if progress_callback:
+            progress_callback(written[0], total_frames)
+
+    try:
+        write_frames(out, decode, (frame_height, frame_width, 3), report)
+    finally:
+        pool.release(cap)
+        out.release()
+
+    scene_list = build_scene_list(cuts, 0, decoded[0], fps)
+    if not scene_list and os.path.exists(output_path):
+        os.remove(output_path)
+    return scene_list
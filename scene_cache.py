@@ -0,0 +1,131 @@
+"""
+On-disk cache of detected scene lists.
+
+Entries are keyed by a quick fingerprint of the video file (size, mtime and
+hashes of a few sampled blocks) together with the detector settings, so a
+repeat AI Auto Clip on an unchanged file can skip detection completely.
+The cache folder is kept under a size limit by evicting the least recently
+used entries.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024  # 20 MB of cached scene lists
+SAMPLE_BLOCK_SIZE = 64 * 1024
+SAMPLE_COUNT = 8
+
+
+def file_fingerprint(path, block_size=SAMPLE_BLOCK_SIZE, samples=SAMPLE_COUNT):
+    """
+    Cheap content fingerprint: file size, mtime and a hash of `samples`
+    blocks spread evenly through the file (always including the first and
+    last block). Reads at most samples * block_size bytes.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1()
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    with open(path, "rb") as f:
+        last_offset = max(0, stat.st_size - block_size)
+        for i in range(samples):
+            offset = last_offset * i // max(1, samples - 1)
+            f.seek(offset)
+            digest.update(f.read(block_size))
+
+    return digest.hexdigest()
+
+
+class SceneCache:
+    """Stores scene lists as small JSON files in cache_dir."""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, video_file, params):
+        key = hashlib.sha1()
+        key.update(file_fingerprint(video_file).encode())
+        key.update(json.dumps(params, sort_keys=True).encode())
+        return os.path.join(self.cache_dir, f"{key.hexdigest()}.json")
+
+    def get(self, video_file, params):
+        """Returns the cached scene list, or None on a miss."""
+        # Imported here so the app can create the cache without loading PySceneDetect.
+        from scenedetect import FrameTimecode
+
+        try:
+            entry_path = self._entry_path(video_file, params)
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            fps = entry["fps"]
+            scene_list = [(FrameTimecode(start, fps=fps), FrameTimecode(end, fps=fps))
+                          for start, end in entry["scenes"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, truncated or written by an older version: a miss.
+            return None
+
+        # Touch the entry so eviction treats it as recently used.
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return scene_list
+
+    def put(self, video_file, params, scene_list):
+        """Stores a scene list and trims the cache back under max_bytes."""
+        if not scene_list:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            "video_file": os.path.abspath(video_file),
+            "params": params,
+            "fps": scene_list[0][0].get_framerate(),
+            "scenes": [[start.get_frames(), end.get_frames()] for start, end in scene_list],
+        }
+        entry_path = self._entry_path(video_file, params)
+        # A temp file of our own: two jobs may store the same video's scenes at once.
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, entry_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        evict_lru(self.cache_dir, self.max_bytes, (".json",))
+
+
+def evict_lru(cache_dir, max_bytes, suffixes):
+    """
+    Deletes the least recently used files (oldest mtime first) ending in one
+    of `suffixes` until the ones left in cache_dir add up to max_bytes.
+    """
+    entries = []
+    for filename in os.listdir(cache_dir):
+        if not filename.endswith(tuple(suffixes)):
+            continue
+        path = os.path.join(cache_dir, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,202 @@
+"""
+Segment-parallel encoder shared by merge, reverse and compile.
+
+An output is described as a timeline: a list of (video_file, start_frame,
+end_frame, reverse) ranges played one after another. The timeline is cut
+into N segments with the same number of frames, every segment is decoded
+and encoded by its own process into a temp file, and the segment files
+are joined with ffmpeg's concat demuxer without re-encoding.
+
+Without ffmpeg (or with a single worker) the timeline is encoded straight
+into the output file in this process. Either way each range goes through
+a frame pipeline (frame_pipeline.py), so decoding and encoding overlap. Sources that are in the frame cache
+(frame_cache.py) are read from it instead of being decoded.
+
+Clips that don't match the output's size or frame rate (merge) come with a
+normalizer.ClipFormat; their timeline ranges count output frames, which
+are resampled and scaled from the source as they are encoded.
+"""
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+from capture_pool import shared_pool
+from ffmpeg_tools import concat_copy, find_ffmpeg
+from frame_pipeline import copy_frames, decode_frames, write_frames
+from keyframe_index import seek_frame
+from normalizer import read_frames_at
+from parallel_export import CallbackQueue, run_in_pool
+from reverse_engine import DEFAULT_MEMORY_LIMIT, chunk_size_for, reverse_range
+
+# Below this many frames per worker the process start-up isn't worth it.
+MIN_SEGMENT_FRAMES = 250
+
+
+def probe_video(video_file):
+    """
+    Returns (fps, (width, height), frame_count). The frame count is the
+    exact one from the keyframe index, or 0 if it isn't known; OpenCV's
+    own is only an estimate.
+    """
+    pool = shared_pool()
+    info = pool.info(video_file)
+    return info.fps, info.frame_size, pool.exact_frame_count(video_file)
+
+
+def timeline_length(timeline):
+    return sum(end - start for _, start, end, _ in timeline)
+
+
+def split_timeline(timeline, segments):
+    """
+    Splits a timeline into `segments` timelines with (nearly) the same
+    number of frames. A reversed range keeps playing backwards, so cutting
+    timeline positions [a, b) out of a reversed range (start, end) gives
+    the source frames [end - b, end - a), still reversed.
+    """
+    total = timeline_length(timeline)
+    bounds = [total * i // segments for i in range(segments + 1)]
+    result = []
+
+    for seg_start, seg_end in zip(bounds, bounds[1:]):
+        parts = []
+        position = 0
+        for video_file, start, end, reverse in timeline:
+            length = end - start
+            a = max(seg_start, position) - position
+            b = min(seg_end, position + length) - position
+            if a < b:
+                if reverse:
+                    parts.append((video_file, end - b, end - a, True))
+                else:
+                    parts.append((video_file, start + a, start + b, False))
+            position += length
+        if parts:
+            result.append(parts)
+    return result
+
+
+def encode_ranges(timeline, output_path, fps, frame_size, memory_limit=DEFAULT_MEMORY_LIMIT,
+                  frame_cache=None, formats=None, progress_queue=None):
+    """
+    Decodes a timeline and encodes it into output_path with one writer.
+    Sources found in frame_cache (if given) are read from it instead.
+    formats maps a source to the ClipFormat that brings it to the output's
+    size and frame rate, if it needs one. Frame counts are put on
+    progress_queue (if given) as they are written. Returns the number of
+    frames written.
+    """
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(output_path, fourcc, fps, frame_size)
+    if not out.isOpened():
+        raise IOError(f"Could not create output video file: {output_path}")
+
+    pool = shared_pool()
+    caps = {}
+    positions = {}
+    indexes = {}
+    cached = {} # video_file -> frames from the frame cache, or None
+    buffer = None
+    written = 0
+
+    def report(count):
+        if progress_queue is not None and count:
+            progress_queue.put(count)
+
+    def capture(video_file):
+        cap = caps.get(video_file)
+        if cap is None:
+            cap = pool.acquire(video_file)
+            caps[video_file] = cap
+            positions[video_file] = 0
+            indexes[video_file] = pool.keyframes(video_file)
+        return cap
+
+    try:
+        for video_file, start, end, reverse in timeline:
+            if video_file not in cached:
+                cached[video_file] = frame_cache.get(video_file) if frame_cache else None
+            frames = cached[video_file]
+            clip_format = formats.get(video_file) if formats else None
+            info = pool.info(video_file)
+            frame_shape = (info.height, info.width, 3)
+
+            if clip_format is not None:
+                # [start, end) are output frames; pick the source frames they show and scale them.
+                indices = clip_format.source_indices(start, end)
+                if frames is not None:
+                    decode = copy_frames(frames[i] for i in indices[indices < len(frames)])
+                else:
+                    decode = copy_frames(read_frames_at(capture(video_file), indices, positions[video_file],
+                                                        indexes[video_file], np.empty(frame_shape, dtype=np.uint8)))
+                    positions[video_file] = -1
+                normalizer = clip_format.normalizer()
+                written += write_frames(out, decode, frame_shape, report, normalizer.transform,
+                                        normalizer.canvas_shape)
+                continue
+
+            if frames is not None:
+                written += write_frames(out, copy_frames(frames[start:end][::-1] if reverse else frames[start:end]),
+                                        frame_shape, report)
+                continue
+
+            cap = capture(video_file)
+            if reverse:
+                if buffer is None:
+                    buffer = np.empty((chunk_size_for(frame_size[0], frame_size[1], memory_limit),
+                                       frame_size[1], frame_size[0], 3), dtype=np.uint8)
+                written += reverse_range(cap, out, buffer, start, end, report, indexes[video_file])
+                positions[video_file] = -1
+                continue
+
+            if positions[video_file] != start:
+                positions[video_file] = seek_frame(cap, start, positions[video_file], indexes[video_file])
+            count = write_frames(out, decode_frames(cap, end - start), frame_shape, report)
+            positions[video_file] = start + count
+            written += count
+    finally:
+        for cap in caps.values():
+            pool.release(cap)
+        out.release()
+
+    return written
+
+
+def encode_timeline(timeline, output_path, fps, frame_size, workers=None,
+                    memory_limit=DEFAULT_MEMORY_LIMIT, frame_cache=None, formats=None, progress_callback=None):
+    """
+    Encodes a timeline into output_path, in parallel segments when ffmpeg is
+    available to join them. Sources already in frame_cache are read from it,
+    and sources with a ClipFormat in formats are normalized to the output.
+    progress_callback(frames_done, total_frames) is called from the calling
+    thread. Returns the number of frames written.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = timeline_length(timeline)
+    segments = max(1, min(workers, total // MIN_SEGMENT_FRAMES))
+
+    if segments <= 1 or not find_ffmpeg():
+        return encode_ranges(timeline, output_path, fps, frame_size, memory_limit, frame_cache, formats,
+                             CallbackQueue(total, progress_callback))
+
+    # Build any missing keyframe indexes once here, not in every worker.
+    for video_file in {entry[0] for entry in timeline}:
+        shared_pool().keyframes(video_file)
+
+    segment_dir = tempfile.mkdtemp(prefix="segments_")
+    try:
+        segment_timelines = split_timeline(timeline, segments)
+        segment_paths = [os.path.join(segment_dir, f"segment_{i:04d}.mp4") for i in range(len(segment_timelines))]
+        # Each worker gets its share of the reverse memory budget.
+        worker_memory = max(1, memory_limit // len(segment_timelines))
+        jobs = [(seg, path, fps, frame_size, worker_memory, frame_cache, formats)
+                for seg, path in zip(segment_timelines, segment_paths)]
+
+        written = sum(run_in_pool(encode_ranges, jobs, total, progress_callback))
+        concat_copy(segment_paths, output_path)
+        return written
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
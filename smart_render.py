@@ -0,0 +1,164 @@
+"""
+Smart-render cuts: copy whole GOPs, re-encode only the edges.
+
+Cutting frames [start, end) out of a file doesn't need every frame to be
+decoded and encoded again. Only the partial GOP before the first keyframe
+inside the range and the partial GOP after the last one have to be
+re-encoded; the whole GOPs in between are copied packet for packet. The
+pieces are written as MPEG-TS parts (which carry the codec parameters in
+band, so re-encoded and copied parts can follow each other) and joined
+with the concat demuxer.
+
+Cut points come from the keyframe index: ffmpeg is seeked to a keyframe
+timestamp with -noaccurate_seek, so it starts exactly on that keyframe,
+and frames are counted from there. That keeps the output frame-accurate.
+The index holds packet timestamps as they are in the file, so the seek
+uses -seek_timestamp 1 to stop ffmpeg adding the file's start time to
+them (MPEG-TS, many camera files and files with edit lists don't start
+at 0).
+
+Needs ffmpeg, ffprobe and a source codec we can encode again to match
+(H.264, HEVC or MPEG-4 Part 2). Only the video stream is written, like
+the re-encoding path.
+"""
+import concurrent.futures
+import os
+import shutil
+import tempfile
+
+from capture_pool import shared_pool
+from ffmpeg_tools import concat_copy, find_ffmpeg, find_ffprobe, probe_streams, run_ffmpeg
+
+# Source codec -> ffmpeg encoder that re-encodes the cut edges to match it
+ENCODERS = {"h264": "libx264", "hevc": "libx265", "mpeg4": "mpeg4"}
+ENCODER_QUALITY = {
+    "libx264": ["-preset", "veryfast", "-crf", "18"],
+    "libx265": ["-preset", "fast", "-crf", "20"],
+    "mpeg4": ["-q:v", "2"],
+}
+
+
+def _video_stream(video_file):
+    for stream in probe_streams(video_file):
+        if stream.get("codec_type") == "video":
+            return stream
+    return None
+
+
+def can_smart_render(video_file):
+    """True if ffmpeg/ffprobe are available, the codec is supported and the file has a keyframe index."""
+    if not find_ffmpeg() or not find_ffprobe():
+        return False
+    try:
+        stream = _video_stream(video_file)
+    except (RuntimeError, ValueError):
+        return False
+    if stream is None or stream.get("codec_name") not in ENCODERS:
+        return False
+    return shared_pool().keyframes(video_file) is not None
+
+
+def plan_cut(index, start, end):
+    """
+    Splits frames [start, end) into ("encode", a, b) parts for the partial
+    GOPs at the edges and one ("copy", a, b) part for the whole GOPs between.
+    """
+    first = index.keyframe_after(start)
+    # Up to the end of the file the last GOP is whole too.
+    last = end if end >= index.frame_count else index.keyframe_before(end)
+    if first is None or first >= last:
+        return [("encode", start, end)]
+
+    parts = []
+    if start < first:
+        parts.append(("encode", start, first))
+    parts.append(("copy", first, last))
+    if last < end:
+        parts.append(("encode", last, end))
+    return parts
+
+
+class _Source:
+    """What the part renderer needs to know about one input file."""
+
+    def __init__(self, video_file):
+        pool = shared_pool()
+        self.video_file = video_file
+        self.index = pool.keyframes(video_file)
+        self.fps = pool.info(video_file).fps or 25.0
+        stream = _video_stream(video_file)
+        self.encoder = ENCODERS[stream["codec_name"]]
+        self.pix_fmt = stream.get("pix_fmt")
+        self.profile = (stream.get("profile") or "").lower().replace("constrained ", "")
+
+    def seek_args(self, keyframe):
+        # Half a frame past the keyframe's timestamp still seeks to that keyframe,
+        # and -noaccurate_seek keeps every frame from it on. time_of() is the
+        # packet's own timestamp, not relative to the file's start time.
+        return ["-noaccurate_seek", "-seek_timestamp", "1",
+                "-ss", f"{self.index.time_of(keyframe) + 0.5 / self.fps:.6f}"]
+
+    def encoder_args(self):
+        args = ["-c:v", self.encoder] + ENCODER_QUALITY[self.encoder]
+        if self.encoder == "libx264" and self.profile in ("baseline", "main", "high"):
+            args += ["-profile:v", self.profile]
+        if self.pix_fmt:
+            args += ["-pix_fmt", self.pix_fmt]
+        return args
+
+    def render(self, kind, start, end, part_path):
+        if kind == "copy":
+            run_ffmpeg(self.seek_args(start) + ["-i", self.video_file, "-map", "0:v:0", "-c", "copy",
+                                                "-frames:v", str(end - start), "-f", "mpegts", part_path])
+            return
+        gop_start = self.index.keyframe_before(start)
+        trim = f"trim=start_frame={start - gop_start}:end_frame={end - gop_start},setpts=PTS-STARTPTS"
+        run_ffmpeg(self.seek_args(gop_start) + ["-i", self.video_file, "-map", "0:v:0", "-vf", trim]
+                   + self.encoder_args() + ["-f", "mpegts", part_path])
+
+
+def smart_render(outputs, workers=None, progress_callback=None):
+    """
+    outputs maps each output path to the (video_file, start_frame,
+    end_frame) ranges to write into it, one after another. Every part of
+    every output is rendered by a pool of `workers` ffmpeg processes.
+    progress_callback(frames_done, total_frames) is called from the
+    calling thread. Returns the number of frames written.
+    """
+    workers = workers or os.cpu_count() or 1
+    sources = {}
+    part_dir = tempfile.mkdtemp(prefix="smart_render_")
+    try:
+        jobs = [] # (source, kind, start, end, part_path)
+        output_parts = {}
+        for output_path, ranges in outputs.items():
+            output_parts[output_path] = []
+            for video_file, start, end in ranges:
+                if video_file not in sources:
+                    sources[video_file] = _Source(video_file)
+                source = sources[video_file]
+                for kind, a, b in plan_cut(source.index, start, end):
+                    part_path = os.path.join(part_dir, f"part_{len(jobs):05d}.ts")
+                    jobs.append((source, kind, a, b, part_path))
+                    output_parts[output_path].append(part_path)
+
+        total = sum(end - start for _, _, start, end, _ in jobs)
+        done = 0
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {pool.submit(source.render, kind, a, b, part_path): b - a
+                       for source, kind, a, b, part_path in jobs}
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+                done += futures[future]
+                if progress_callback:
+                    progress_callback(done, total)
+        finally:
+            # On an error (or a cancel from progress_callback) don't start the parts still queued.
+            pool.shutdown(cancel_futures=True)
+
+        for output_path, part_paths in output_parts.items():
+            concat_copy(part_paths, output_path)
+        return total
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
@@ -0,0 +1,78 @@
+"""
+Live view of the shared metrics (metrics.py): counters, timers and gauges
+recorded by the decode, detect, transform and encode loops of the running
+jobs, refreshed twice a second. Reset starts a fresh measurement and Save
+writes the current numbers to a JSON file.
+"""
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from metrics import shared_metrics
+
+REFRESH_MS = 500
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def format_snapshot(snapshot):
+    """The lines the window shows for a Metrics.snapshot()."""
+    lines = ["Timers (ms)", f"  {'name':<20}{'count':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'max':>9}"]
+    for name, timer in sorted(snapshot["timers"].items()):
+        lines.append(f"  {name:<20}{timer['count']:>9}{_ms(timer['mean']):>9}{_ms(timer['p50']):>9}"
+                     f"{_ms(timer['p95']):>9}{_ms(timer['max']):>9}")
+    lines += ["", "Counters"]
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f"  {name:<26}{value:>12}")
+    lines += ["", "Gauges (last / max)"]
+    for name, gauge in sorted(snapshot["gauges"].items()):
+        lines.append(f"  {name:<26}{gauge['last']:>6} / {gauge['max']}")
+    return lines
+
+
+class StatsWindow(tk.Toplevel):
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Stats")
+        self.geometry("560x480")
+        self.configure(bg="#2c3e50")
+
+        tk.Label(self, text="Stats", bg="#2c3e50", fg="#ecf0f1", font=("Arial", 14, "bold")).pack(pady=(15, 10))
+        self.text = tk.Text(self, bg="#34495e", fg="#ecf0f1", relief=tk.FLAT, font=("Courier", 10), height=20)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=20)
+
+        buttons = tk.Frame(self, bg="#2c3e50")
+        buttons.pack(pady=10)
+        tk.Button(buttons, text="Reset", command=self.reset, bg="#e74c3c", fg="#ecf0f1", relief=tk.FLAT,
+                  font=("Arial", 10, "bold")).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Save JSON...", command=self.save, bg="#3498db", fg="#ecf0f1", relief=tk.FLAT,
+                  font=("Arial", 10, "bold")).pack(side=tk.LEFT, padx=5)
+
+        self.refresh()
+
+    def refresh(self):
+        """Shows the current numbers and schedules the next refresh."""
+        if not self.winfo_exists():
+            return
+        self.show()
+        self.after(REFRESH_MS, self.refresh)
+
+    def show(self):
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, "\n".join(format_snapshot(shared_metrics().snapshot())))
+        self.text.config(state=tk.DISABLED)
+
+    def reset(self):
+        shared_metrics().reset()
+        self.show()
+
+    def save(self):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            shared_metrics().dump(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not save the metrics:\n{e}", parent=self)
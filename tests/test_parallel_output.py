@@ -0,0 +1,60 @@
+"""
+Frame counts of outputs written by several worker processes. The parent's
+capture pool is warmed first, so workers that inherited its open captures
+(as forked ones would) show up as short outputs. Needs OpenCV; the reverse
+test also needs ffmpeg to join the segments.
+"""
+import os
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from benchmarks.common import make_synthetic_video
+from capture_pool import shared_pool
+from ffmpeg_tools import find_ffmpeg
+
+FRAMES = 600 # Long enough for the segment encoder to use two workers
+SCENE_LENGTH = 60
+
+
+def count_frames(path):
+    cap = cv2.VideoCapture(path)
+    count = 0
+    while cap.grab():
+        count += 1
+    cap.release()
+    return count
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / "source.mp4")
+    make_synthetic_video(path, 160, 90, FRAMES, scene_length=SCENE_LENGTH)
+    # Leave idle captures of the source open in this process.
+    pool = shared_pool()
+    pool.release(pool.acquire(path))
+    pool.info(path)
+    return path
+
+
+def test_multi_worker_export_writes_every_frame(source, tmp_path):
+    from parallel_export import export_scenes
+
+    output_dir = str(tmp_path / "scenes")
+    os.makedirs(output_dir)
+    scenes = [(f"scene_{i}", start, start + SCENE_LENGTH) for i, start in enumerate(range(0, FRAMES, SCENE_LENGTH))]
+    assert export_scenes(source, scenes, output_dir, workers=4) == FRAMES
+    for name, _, _ in scenes:
+        assert count_frames(os.path.join(output_dir, f"{name}.mp4")) == SCENE_LENGTH
+
+
+@pytest.mark.skipif(not find_ffmpeg(), reason="needs ffmpeg to join the segments")
+def test_multi_worker_reverse_writes_every_frame(source, tmp_path):
+    from segment_encoder import encode_timeline
+
+    output_path = str(tmp_path / "reversed.mp4")
+    info = shared_pool().info(source)
+    written = encode_timeline([(source, 0, FRAMES, True)], output_path, info.fps, info.frame_size, workers=4)
+    assert written == FRAMES
+    assert count_frames(output_path) == FRAMES
@@ -0,0 +1,171 @@
+"""
+Edge cases of the pure planning code: how timelines are split into
+segments, scenes into export runs, cuts into copied and re-encoded parts,
+how the keyframe index is built from packets and how output names are
+numbered. Modules that import OpenCV are skipped where it isn't installed.
+"""
+import os
+
+import pytest
+
+from output_names import INDEX_FILE, OutputNames
+
+
+def _segment_encoder():
+    return pytest.importorskip("segment_encoder")
+
+
+def _parallel_export():
+    return pytest.importorskip("parallel_export")
+
+
+def _keyframe_index(keyframes, frame_count):
+    keyframe_index = pytest.importorskip("keyframe_index")
+    return keyframe_index.KeyframeIndex(keyframes, [k / 25.0 for k in keyframes], frame_count)
+
+
+def _plan_cut(index, start, end):
+    return pytest.importorskip("smart_render").plan_cut(index, start, end)
+
+
+# split_timeline
+
+def test_split_timeline_empty():
+    assert _segment_encoder().split_timeline([], 3) == []
+
+
+def test_split_timeline_single_frame_makes_one_segment():
+    assert _segment_encoder().split_timeline([("a", 0, 1, False)], 4) == [[("a", 0, 1, False)]]
+
+
+def test_split_timeline_reversed_range_keeps_playing_backwards():
+    segments = _segment_encoder().split_timeline([("a", 0, 10, True)], 2)
+    assert segments == [[("a", 5, 10, True)], [("a", 0, 5, True)]]
+
+
+def test_split_timeline_segment_spanning_two_ranges():
+    timeline = [("a", 0, 3, False), ("b", 0, 3, True)]
+    segments = _segment_encoder().split_timeline(timeline, 3)
+    assert segments == [
+        [("a", 0, 2, False)],
+        [("a", 2, 3, False), ("b", 2, 3, True)],
+        [("b", 0, 2, True)],
+    ]
+
+
+def test_split_timeline_keeps_every_frame():
+    segment_encoder = _segment_encoder()
+    timeline = [("a", 5, 12, False), ("b", 0, 9, True), ("c", 3, 4, False)]
+    for segments in range(1, 20):
+        parts = segment_encoder.split_timeline(timeline, segments)
+        assert sum(segment_encoder.timeline_length(part) for part in parts) == 17
+
+
+# split_contiguous
+
+def test_split_contiguous_empty():
+    assert _parallel_export().split_contiguous([], 4) == []
+
+
+def test_split_contiguous_more_groups_than_scenes():
+    scenes = [("s1", 0, 1)]
+    assert _parallel_export().split_contiguous(scenes, 4) == [scenes]
+
+
+def test_split_contiguous_equal_halves():
+    scenes = [("s1", 0, 10), ("s2", 10, 20), ("s3", 20, 30), ("s4", 30, 40)]
+    assert _parallel_export().split_contiguous(scenes, 2) == [scenes[:2], scenes[2:]]
+
+
+def test_split_contiguous_zero_groups_is_one_run():
+    scenes = [("s1", 0, 10), ("s2", 10, 20)]
+    assert _parallel_export().split_contiguous(scenes, 0) == [scenes]
+
+
+# plan_cut
+
+def test_plan_cut_on_keyframes_is_a_pure_copy():
+    index = _keyframe_index([0, 10, 20], 30)
+    assert _plan_cut(index, 10, 20) == [("copy", 10, 20)]
+
+
+def test_plan_cut_encodes_partial_gops_at_both_edges():
+    index = _keyframe_index([0, 10, 20], 30)
+    assert _plan_cut(index, 5, 25) == [("encode", 5, 10), ("copy", 10, 20), ("encode", 20, 25)]
+
+
+def test_plan_cut_inside_one_gop_is_encoded():
+    index = _keyframe_index([0, 10, 20], 30)
+    assert _plan_cut(index, 12, 18) == [("encode", 12, 18)]
+
+
+def test_plan_cut_single_frame():
+    index = _keyframe_index([0, 10, 20], 30)
+    assert _plan_cut(index, 10, 11) == [("encode", 10, 11)]
+    assert _plan_cut(index, 29, 30) == [("encode", 29, 30)]
+
+
+def test_plan_cut_last_gop_is_whole_up_to_the_end():
+    index = _keyframe_index([0, 10, 20], 30)
+    assert _plan_cut(index, 20, 30) == [("copy", 20, 30)]
+
+
+# KeyframeIndex.from_packets
+
+def test_from_packets_orders_by_presentation_time():
+    keyframe_index = pytest.importorskip("keyframe_index")
+    # Decode order with B-frames: I P B B I
+    packets = [(0.0, True), (0.12, False), (0.04, False), (0.08, False), (0.16, True)]
+    index = keyframe_index.KeyframeIndex.from_packets(packets)
+    assert index.keyframes == [0, 4]
+    assert index.keyframe_times == [0.0, 0.16]
+    assert index.frame_count == 5
+    assert index.keyframe_before(3) == 0
+    assert index.keyframe_after(1) == 4
+    assert index.keyframe_after(5) is None
+
+
+def test_from_packets_empty():
+    keyframe_index = pytest.importorskip("keyframe_index")
+    index = keyframe_index.KeyframeIndex.from_packets([])
+    assert (index.keyframes, index.frame_count) == ([], 0)
+    assert index.keyframe_before(10) == 0
+
+
+# OutputNames
+
+def _touch(directory, *names):
+    for name in names:
+        open(os.path.join(directory, name), "w").close()
+
+
+def test_output_names_bare_name_first(tmp_path):
+    names = OutputNames()
+    assert os.path.basename(names.claim(tmp_path, "merged_video", ".mp4")) == "merged_video.mp4"
+    assert os.path.basename(names.claim(tmp_path, "merged_video", ".mp4")) == "merged_video_1.mp4"
+
+
+def test_output_names_continue_after_existing_files(tmp_path):
+    _touch(tmp_path, "last_frame_3.png", "last_frame_copy_9.png", "last_frame_7.jpg")
+    path = OutputNames().claim(tmp_path, "last_frame", ".png", bare_first=False)
+    assert os.path.basename(path) == "last_frame_4.png"
+
+
+def test_output_names_rescan_when_index_is_deleted(tmp_path):
+    names = OutputNames()
+    names.claim(tmp_path, "clip(1)", ".mp4")
+    names.claim(tmp_path, "clip(1)", ".mp4")
+    os.remove(os.path.join(tmp_path, INDEX_FILE))
+    assert os.path.basename(names.claim(tmp_path, "clip(1)", ".mp4")) == "clip(1)_2.mp4"
+
+
+def test_output_names_skip_names_taken_behind_the_index(tmp_path):
+    names = OutputNames()
+    names.claim(tmp_path, "a", ".mp4")
+    _touch(tmp_path, "a_1.mp4", "a_2.mp4") # e.g. written by another process
+    assert os.path.basename(names.claim(tmp_path, "a", ".mp4")) == "a_3.mp4"
+
+
+def test_output_names_two_registries_never_collide(tmp_path):
+    paths = {OutputNames().claim(tmp_path, "c", ".mp4") for _ in range(10)}
+    assert len(paths) == 10
@@ -0,0 +1,617 @@
+"""
+The video operations behind the app's buttons, without any UI.
+
+Everything here runs without a display so it can be used from the Tk app
+and from the command line (cli.py) alike. Functions raise exceptions
+instead of showing message boxes and return the paths they wrote;
+long-running ones take an optional progress_callback(done, total).
+
+OpenCV, PySceneDetect and the engines built on them are imported inside
+the functions that use them, so importing this module (and starting the
+app) stays fast.
+"""
+import os
+import re
+
+from ffmpeg_tools import can_stream_copy, concat_copy
+from job_queue import JobCancelled
+from output_names import shared_names
+
+# Output folders, created under the chosen output root
+LAST_FRAME_DIR = "last_frame"
+REVERSED_DIR = "reversed_clip"
+MERGED_DIR = "merged_clips"
+COMPILED_DIR = "compiled_clips"
+SCENE_CACHE_DIR = "scene_cache"
+PROXY_CACHE_DIR = "proxy_cache"
+
+# Same default as reverse_engine.DEFAULT_MEMORY_LIMIT, kept here so the
+# options can be built without importing OpenCV.
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+
+class VideoOptions:
+    """Tuning knobs shared by the GUI and the command line."""
+
+    def __init__(self):
+        # Reverse engine
+        self.reverse_memory_limit = DEFAULT_MEMORY_LIMIT # Max bytes of decoded frames held at once
+        self.reverse_strategy = "seek" # "seek" re-reads chunks, "spill" uses temp files
+
+        # Decoded-frame cache
+        # Bytes of decoded frames kept on disk so reverse, scene saving and compile don't decode
+        # the same clip again; 0 turns the cache off
+        self.frame_cache_bytes = 0
+
+        # Merge
+        self.merge_mode = "auto" # "auto" stream-copies compatible clips, "reencode" always decodes
+        self.merge_size = None # (width, height) of a merged video, None uses the first clip's
+        self.merge_fps = None # Frame rate of a merged video, None uses the first clip's
+        self.merge_fit = "letterbox" # Clips of another shape get black bars ("letterbox") or are stretched ("stretch")
+
+        # Scene compile and export
+        self.cut_mode = "auto" # "auto" copies whole GOPs and re-encodes only the cut edges, "reencode" decodes everything
+
+        # AI Auto Clip
+        # "single_pass" detects and compiles in one decode, "incremental" saves each scene as soon as
+        # it is found and joins them at the end, "two_pass" detects everything first, then compiles
+        self.auto_clip_mode = "single_pass"
+        self.scene_detector = "content" # "content" is PySceneDetect's ContentDetector, "batch" the vectorized BatchDetector
+        self.analysis_downscale = None # Detection downscale factor, None picks one from the width
+        self.analysis_stride = 1 # Only run the detector on every Nth frame, cuts are refined afterwards
+
+        # Parallelism
+        self.max_jobs = 1 # Operations run at the same time; more wait their turn in the job queue
+        self.export_workers = os.cpu_count() or 1 # Processes used to save scenes as separate clips
+        self.encode_workers = os.cpu_count() or 1 # Processes used to encode merge, reverse and compile outputs
+
+    def scene_detection_params(self):
+        """Detector settings that go into the scene cache key."""
+        return {
+            "detector": "BatchDetector" if self.scene_detector == "batch" else "ContentDetector",
+            "downscale": self.analysis_downscale,
+            "stride": self.analysis_stride,
+        }
+
+
+def _check_exists(video_file):
+    if not os.path.exists(video_file):
+        raise FileNotFoundError(f"The file '{video_file}' was not found.")
+
+
+def _remove_if_empty(path):
+    """Drops a claimed output file that never got written."""
+    try:
+        if os.path.getsize(path) == 0:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _discard_output(path, error):
+    """Cleans up after a failed operation: a cancelled one loses its partial output too."""
+    if isinstance(error, JobCancelled):
+        _remove_quietly(path)
+    else:
+        _remove_if_empty(path)
+
+
+def _frame_cache(video_file, options, progress_callback=None):
+    """
+    The frame cache with video_file's frames in it, decoding them on a
+    miss. None if the cache is off or the clip is too big for it.
+    """
+    if not options.frame_cache_bytes:
+        return None
+    from frame_cache import FrameCache
+
+    def filling(done, total):
+        # Decoding into the cache isn't part of the operation's own count;
+        # report "working" so the job can still be cancelled meanwhile.
+        if progress_callback:
+            progress_callback(0, 0)
+
+    cache = FrameCache(max_bytes=options.frame_cache_bytes)
+    return cache if cache.load(video_file, filling) is not None else None
+
+
+def unique_output_path(output_dir, base_name, extension):
+    """
+    Returns output_dir/base_name+extension, or base_name_N+extension after
+    the last one saved there. The name is claimed with an empty file
+    straight away, so jobs running at the same time can't pick the same one.
+    """
+    return shared_names().claim(output_dir, base_name, extension)
+
+
+def next_frame_path(output_dir, output_file):
+    """Returns (and claims) the next free base_N.ext name for a saved frame."""
+    base_name, extension = os.path.splitext(output_file)
+    base_name = re.sub(r'_\d+$', '', base_name)
+    return shared_names().claim(output_dir, base_name, extension, bare_first=False)
+
+
+def extract_last_frame(video_file, output_dir, output_file="last_frame.png"):
+    """Saves the last frame of video_file into output_dir. Returns the image path."""
+    import cv2
+    from last_frame import read_last_frame
+
+    _check_exists(video_file)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Seeks near the end by timestamp rather than trusting the frame count.
+    last_frame = read_last_frame(video_file)
+
+    full_path = next_frame_path(output_dir, output_file)
+    try:
+        saved = cv2.imwrite(full_path, last_frame)
+    except BaseException:
+        # e.g. cv2.error for an extension OpenCV can't write. The claimed file
+        # may be empty or half written; either way it isn't a frame.
+        _remove_quietly(full_path)
+        raise
+    if not saved:
+        _remove_quietly(full_path)
+        raise IOError(f"Failed to save the image: {full_path}")
+    return full_path
+
+
+def extract_last_frames(video_files, output_dir, output_file="last_frame.png", workers=None, progress_callback=None):
+    """
+    Batch version of extract_last_frame that works on several clips at once.
+    Returns a list of (video_file, image_path or the exception raised), in
+    the order the files were given. progress_callback(clips_done, total)
+    is called as clips finish.
+    """
+    import concurrent.futures
+
+    workers = workers or min(len(video_files), os.cpu_count() or 1) or 1
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [pool.submit(extract_last_frame, f, output_dir, output_file) for f in video_files]
+        if progress_callback:
+            for done, _ in enumerate(concurrent.futures.as_completed(futures), 1):
+                progress_callback(done, len(futures))
+        results = []
+        for video_file, future in zip(video_files, futures):
+            try:
+                results.append((video_file, future.result()))
+            except Exception as e:
+                results.append((video_file, e))
+    finally:
+        # A cancel from progress_callback shouldn't wait for the clips not started yet.
+        pool.shutdown(cancel_futures=True)
+    return results
+
+
+def reverse_clip(video_file, output_dir, options=None, progress_callback=None):
+    """Writes a reversed copy of video_file into output_dir. Returns the output path."""
+    from reverse_engine import reverse_video
+    from segment_encoder import encode_timeline, probe_video
+
+    options = options or VideoOptions()
+    _check_exists(video_file)
+    os.makedirs(output_dir, exist_ok=True)
+
+    base_name, extension = os.path.splitext(os.path.basename(video_file))
+    output_path = unique_output_path(output_dir, f"{base_name}_reversed", extension)
+
+    try:
+        fps, frame_size, frame_count = probe_video(video_file)
+        frame_cache = _frame_cache(video_file, options, progress_callback)
+        if frame_cache:
+            # Cached frames are read backwards straight from the map, no seeking.
+            frame_count = len(frame_cache.get(video_file))
+        if frame_cache or (options.reverse_strategy == "seek" and frame_count > 0):
+            # Reversed timeline, encoded in parallel segments when possible.
+            encode_timeline([(video_file, 0, frame_count, True)], output_path, fps, frame_size,
+                            workers=options.encode_workers, memory_limit=options.reverse_memory_limit,
+                            frame_cache=frame_cache, progress_callback=progress_callback)
+        else:
+            # Reverse in bounded chunks so long clips don't have to fit in memory.
+            reverse_video(video_file, output_path, memory_limit=options.reverse_memory_limit,
+                          strategy=options.reverse_strategy, progress_callback=progress_callback)
+    except BaseException as e:
+        _discard_output(output_path, e)
+        raise
+    return output_path
+
+
+def merge_clips(clips, output_dir, options=None, progress_callback=None):
+    """Joins the clips one after another into output_dir. Returns the output path."""
+    options = options or VideoOptions()
+    if not clips:
+        raise ValueError("Please add at least one clip to merge.")
+    for clip in clips:
+        _check_exists(clip)
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = unique_output_path(output_dir, "merged_video", ".mp4")
+    try:
+        return _merge_into(clips, output_path, options, progress_callback)
+    except BaseException as e:
+        _discard_output(output_path, e)
+        raise
+
+
+def _merge_into(clips, output_path, options, progress_callback):
+    import itertools
+    import cv2
+    import numpy as np
+    from capture_pool import shared_pool
+    from frame_cache import FrameCache
+    from frame_pipeline import copy_frames, decode_frames, write_frames
+    from normalizer import clip_formats, read_frames_at
+    from segment_encoder import encode_timeline
+
+    # Sizes and frame rates come from the pool's metadata
+    # cache, so clips that were opened before aren't parsed again.
+    pool = shared_pool()
+    infos = [pool.info(clip) for clip in clips]
+    # Clips that differ from the output size or frame rate get a ClipFormat that normalizes them.
+    fps, frame_size, formats = clip_formats(infos, options.merge_size, options.merge_fps, options.merge_fit)
+    needs_normalizing = any(formats)
+
+    # Fast path: clips with the same codec, size and timebase are joined
+    # packet by packet with ffmpeg, without decoding or re-encoding.
+    if options.merge_mode == "auto" and not needs_normalizing and can_stream_copy(clips):
+        try:
+            concat_copy(clips, output_path)
+            return output_path
+        except RuntimeError:
+            # Fall back to the decode/re-encode path below, which overwrites
+            # whatever ffmpeg left behind.
+            pass
+
+    # With exact frame counts (from the keyframe index, not OpenCV's
+    # estimate) the clips form one timeline that is encoded in parallel
+    # segments. A normalized clip's range counts output frames.
+    timeline = []
+    for clip, clip_format in zip(clips, formats):
+        frame_count = pool.exact_frame_count(clip)
+        if clip_format and frame_count:
+            frame_count = clip_format.output_count(frame_count)
+        timeline.append((clip, 0, frame_count, False))
+    if all(end > 0 for _, _, end, _ in timeline):
+        # Clips that are already in the frame cache are read from it; merging alone doesn't fill it.
+        frame_cache = FrameCache(max_bytes=options.frame_cache_bytes) if options.frame_cache_bytes else None
+        encode_timeline(timeline, output_path, fps, frame_size, workers=options.encode_workers,
+                        frame_cache=frame_cache, formats={clip: f for clip, f in zip(clips, formats) if f},
+                        progress_callback=progress_callback)
+        return output_path
+
+    # Without an index, read every clip to the end on this process.
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(output_path, fourcc, fps, frame_size)
+    if not out.isOpened():
+        raise IOError("Could not create the output video file. Check codec compatibility.")
+
+    try:
+        for clip, info, clip_format in zip(clips, infos, formats):
+            frame_shape = (info.height, info.width, 3)
+            with pool.capture(clip) as cap:
+                if clip_format:
+                    indices = map(clip_format.source_index, itertools.count())
+                    normalizer = clip_format.normalizer()
+                    decode = copy_frames(read_frames_at(cap, indices, 0, buffer=np.empty(frame_shape, dtype=np.uint8)))
+                    write_frames(out, decode, frame_shape, transform=normalizer.transform,
+                                 output_shape=normalizer.canvas_shape)
+                else:
+                    write_frames(out, decode_frames(cap), frame_shape)
+    finally:
+        out.release()
+    return output_path
+
+
+def make_detector(options):
+    """A fresh scene detector of the kind options.scene_detector asks for."""
+    if options.scene_detector == "batch":
+        from batch_detector import BatchDetector
+        return BatchDetector()
+    from scenedetect.detectors import ContentDetector
+    return ContentDetector()
+
+
+def detect_scenes(video_file, options=None, scene_cache=None, progress_callback=None):
+    """
+    Returns the list of (start, end) FrameTimecode scenes in video_file,
+    using and filling scene_cache when one is given. Only the fast analysis
+    mode reports progress.
+    """
+    from scenedetect import open_video, SceneManager
+    from scenedetect.detectors import ContentDetector
+    from metrics import shared_metrics
+    from scene_analysis import detect_scenes_fast, timed_detector
+
+    options = options or VideoOptions()
+    _check_exists(video_file)
+    params = options.scene_detection_params()
+
+    if scene_cache:
+        cached_scenes = scene_cache.get(video_file, params)
+        if cached_scenes:
+            return cached_scenes
+
+    if options.analysis_downscale or options.analysis_stride > 1 or options.scene_detector != "content":
+        # Fast analysis: smaller frames, fewer of them, cuts refined to the exact frame.
+        # The batch detector always runs in this loop.
+        scene_list = detect_scenes_fast(video_file, downscale=options.analysis_downscale,
+                                        stride=options.analysis_stride, detector=make_detector(options),
+                                        progress_callback=progress_callback)
+    else:
+        # Use the new open_video function, which is the modern replacement for the deprecated VideoManager.
+        video = open_video(video_file)
+        scene_manager = SceneManager()
+        # Detection is timed per frame like the fast path's, so the stats can compare them.
+        scene_manager.add_detector(timed_detector(ContentDetector()))
+
+        # The detect_scenes function now takes the video object directly.
+        # SceneManager decodes on its own thread, so decoding is only counted.
+        metrics = shared_metrics()
+        with metrics.timer("scene_manager_pass"):
+            scene_manager.detect_scenes(video=video)
+        metrics.count("frames_decoded", video.frame_number)
+        scene_list = scene_manager.get_scene_list()
+
+    if scene_cache and scene_list:
+        scene_cache.put(video_file, params, scene_list)
+    return scene_list
+
+
+def next_compiled_path(video_file, output_dir):
+    """Returns a compiled output path that doesn't overwrite an earlier one."""
+    base_name = os.path.basename(os.path.splitext(video_file)[0])
+    return unique_output_path(output_dir, f"{base_name}_compiled", ".mp4")
+
+
+def compile_scenes(video_file, scene_list, selected_indices, output_dir, options=None, progress_callback=None):
+    """Compiles the selected scenes into one video in output_dir. Returns the output path."""
+    from segment_encoder import encode_timeline, probe_video
+    from smart_render import can_smart_render, smart_render
+
+    options = options or VideoOptions()
+    _check_exists(video_file)
+    os.makedirs(output_dir, exist_ok=True)
+
+    fps, frame_size, _ = probe_video(video_file)
+    output_path = next_compiled_path(video_file, output_dir)
+
+    # The selected scenes, one after another, encoded in parallel segments
+    timeline = [(video_file, scene_list[index][0].get_frames(), scene_list[index][1].get_frames(), False)
+                for index in selected_indices]
+    try:
+        if options.cut_mode == "auto" and can_smart_render(video_file):
+            ranges = [(source, start, end) for source, start, end, _ in timeline]
+            smart_render({output_path: ranges}, workers=options.encode_workers,
+                         progress_callback=progress_callback)
+        else:
+            encode_timeline(timeline, output_path, fps, frame_size, workers=options.encode_workers,
+                            frame_cache=_frame_cache(video_file, options, progress_callback),
+                            progress_callback=progress_callback)
+    except BaseException as e:
+        _discard_output(output_path, e)
+        raise
+    return output_path
+
+
+def save_scenes(video_file, scene_list, selected_indices, output_dir, options=None, progress_callback=None):
+    """Saves each selected scene as output_dir/scene_N.mp4, spread over a process pool."""
+    from parallel_export import export_scenes
+    from smart_render import can_smart_render, smart_render
+
+    options = options or VideoOptions()
+    _check_exists(video_file)
+    os.makedirs(output_dir, exist_ok=True)
+
+    scenes = []
+    for index in selected_indices:
+        start_timecode, end_timecode = scene_list[index]
+        scenes.append((f"scene_{index + 1}", start_timecode.get_frames(), end_timecode.get_frames()))
+
+    try:
+        if options.cut_mode == "auto" and can_smart_render(video_file):
+            outputs = {os.path.join(output_dir, f"{name}.mp4"): [(video_file, start, end)]
+                       for name, start, end in scenes}
+            smart_render(outputs, workers=options.export_workers, progress_callback=progress_callback)
+        else:
+            export_scenes(video_file, scenes, output_dir, workers=options.export_workers,
+                          frame_cache=_frame_cache(video_file, options, progress_callback),
+                          progress_callback=progress_callback)
+    except JobCancelled:
+        # Half a set of scenes is no use either.
+        for name, _, _ in scenes:
+            try:
+                os.remove(os.path.join(output_dir, f"{name}.mp4"))
+            except OSError:
+                pass
+        raise
+    return output_dir
+
+
+def detect_and_compile_scenes(video_file, output_dir, options=None, scene_cache=None, progress_callback=None):
+    """
+    Single-pass auto clip: detects scenes and compiles all of them while
+    the video is decoded only once. Returns (scene_list, output_path);
+    output_path is None when no scenes were found.
+    """
+    from scene_analysis import detect_and_compile
+
+    options = options or VideoOptions()
+    _check_exists(video_file)
+    os.makedirs(output_dir, exist_ok=True)
+
+    output_path = next_compiled_path(video_file, output_dir)
+    try:
+        scene_list = detect_and_compile(video_file, output_path, detector=make_detector(options),
+                                        downscale=options.analysis_downscale,
+                                        stride=options.analysis_stride, progress_callback=progress_callback)
+    except BaseException as e:
+        _discard_output(output_path, e)
+        raise
+    if not scene_list:
+        return scene_list, None
+
+    if scene_cache:
+        scene_cache.put(video_file, options.scene_detection_params(), scene_list)
+    return scene_list, output_path
+
+
+def detect_scenes_live(video_file, options=None, scene_cache=None, on_scene=None, progress_callback=None):
+    """
+    detect_scenes that calls on_scene(index, start, end) for each scene as
+    soon as it has been found, from the calling thread. A cache hit reports
+    every scene straight away. Returns the scene list.
+    """
+    from scene_analysis import detect_scenes_incremental
+
+    options = options or VideoOptions()
+    _check_exists(video_file)
+    params = options.scene_detection_params()
+
+    scene_list = scene_cache.get(video_file, params) if scene_cache else None
+    if scene_list:
+        for index, (start, end) in enumerate(scene_list):
+            if on_scene:
+                on_scene(index, start, end)
+        return scene_list
+
+    found = [0]
+
+    def report_scene(start, end):
+        if on_scene:
+            on_scene(found[0], start, end)
+        found[0] += 1
+
+    scene_list = detect_scenes_incremental(video_file, report_scene, detector=make_detector(options),
+                                           downscale=options.analysis_downscale,
+                                           stride=options.analysis_stride, progress_callback=progress_callback)
+    if scene_cache and scene_list:
+        scene_cache.put(video_file, params, scene_list)
+    return scene_list
+
+
+def auto_clip_incremental(video_file, output_dir, options=None, scene_cache=None, on_scene=None,
+                          on_saved=None, progress_callback=None):
+    """
+    Incremental auto clip: every scene is saved as its own clip in
+    output_dir/<name>_scenes/ as soon as detection has found where it ends,
+    while the rest of the file is still being analysed, so the first clips
+    are ready within seconds even for very long recordings. At the end the
+    clips are joined into the compiled video (without re-encoding when
+    ffmpeg is available).
+
+    on_scene(index, start, end) is called when a scene is found and
+    on_saved(index, clip_path) when its clip is written; both run on worker
+    threads. progress_callback follows detection, which is the slow part.
+    Returns (scene_list, output_path, scenes_dir); output_path is None when
+    no scenes were found.
+    """
+    import queue
+    import threading
+    from ffmpeg_tools import find_ffmpeg
+    from parallel_export import export_scene_run
+    from smart_render import can_smart_render, smart_render
+
+    options = options or VideoOptions()
+    _check_exists(video_file)
+    base_name = os.path.basename(os.path.splitext(video_file)[0])
+    scenes_dir = os.path.join(output_dir, f"{base_name}_scenes")
+    os.makedirs(scenes_dir, exist_ok=True)
+    smart = options.cut_mode == "auto" and can_smart_render(video_file)
+
+    pending = queue.Queue() # (index, start_frame, end_frame), None when detection is over
+    clip_paths = {}
+    export_errors = []
+    stopping = threading.Event() # Detection failed or was cancelled: don't start more clips
+
+    def export_loop():
+        while True:
+            item = pending.get()
+            if item is None or export_errors or stopping.is_set():
+                return
+            index, start, end = item
+            name = f"scene_{index + 1}"
+            clip_path = os.path.join(scenes_dir, f"{name}.mp4")
+            try:
+                if smart:
+                    smart_render({clip_path: [(video_file, start, end)]}, workers=options.export_workers)
+                else:
+                    export_scene_run(video_file, [(name, start, end)], scenes_dir)
+            except Exception as e:
+                export_errors.append(e)
+                return
+            clip_paths[index] = clip_path
+            if on_saved:
+                on_saved(index, clip_path)
+
+    # The exporter decodes with its own capture, next to the detector's.
+    exporter = threading.Thread(target=export_loop, daemon=True)
+    exporter.start()
+
+    def scene_found(index, start, end):
+        if export_errors:
+            raise export_errors[0]
+        pending.put((index, start.get_frames(), end.get_frames()))
+        if on_scene:
+            on_scene(index, start, end)
+
+    try:
+        scene_list = detect_scenes_live(video_file, options, scene_cache, scene_found, progress_callback)
+    except BaseException:
+        stopping.set()
+        raise
+    finally:
+        pending.put(None)
+        exporter.join()
+    if export_errors:
+        raise export_errors[0]
+    if not scene_list:
+        return scene_list, None, scenes_dir
+
+    if not find_ffmpeg():
+        output_path = compile_scenes(video_file, scene_list, range(len(scene_list)), output_dir,
+                                     options, progress_callback)
+        return scene_list, output_path, scenes_dir
+
+    output_path = next_compiled_path(video_file, output_dir)
+    try:
+        concat_copy([clip_paths[index] for index in range(len(scene_list))], output_path)
+    except BaseException as e:
+        _discard_output(output_path, e)
+        raise
+    return scene_list, output_path, scenes_dir
+
+
+def auto_clip(video_file, output_dir, options=None, scene_cache=None, progress_callback=None):
+    """
+    The whole AI Auto Clip flow: detect scenes (or take them from the
+    cache) and compile all of them. Returns (scene_list, output_path);
+    output_path is None when no scenes were found.
+    """
+    options = options or VideoOptions()
+    if scene_cache:
+        cached_scenes = scene_cache.get(video_file, options.scene_detection_params())
+        if cached_scenes:
+            output_path = compile_scenes(video_file, cached_scenes, range(len(cached_scenes)), output_dir,
+                                         options, progress_callback)
+            return cached_scenes, output_path
+
+    if options.auto_clip_mode == "single_pass":
+        return detect_and_compile_scenes(video_file, output_dir, options, scene_cache, progress_callback)
+    if options.auto_clip_mode == "incremental":
+        scene_list, output_path, _ = auto_clip_incremental(video_file, output_dir, options, scene_cache,
+                                                           progress_callback=progress_callback)
+        return scene_list, output_path
+
+    scene_list = detect_scenes(video_file, options, scene_cache)
+    if not scene_list:
+        return scene_list, None
+    output_path = compile_scenes(video_file, scene_list, range(len(scene_list)), output_dir,
+                                 options, progress_callback)
+    return scene_list, output_path